@@ -0,0 +1,53 @@
+import os
+
+# Run every window and the mixer headless; set before hs imports pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import logging
+import shutil
+import tempfile
+import threading
+
+from werkzeug.serving import make_server
+
+import hs
+
+# Setup shared by the tools that run the whole app headless under synthetic
+# load (latency_harness.py, soak_test.py): a scratch directory holding the
+# app's files, and the web app served on a free local port.
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+
+def prepare_workdir(prefix, team_count, settings, config):
+    # Make a scratch directory with the sound effects and fresh teams,
+    # settings and config, and make it the working directory
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    for filename in (hs.sound_effect_file_add, hs.sound_effect_file_subtract):
+        shutil.copy(os.path.join(here, filename), workdir)
+    os.chdir(workdir)
+
+    teams = [{'name': f"Team {i + 1}", 'score': 0, 'color': hs.team_color_palette[i % len(hs.team_color_palette)]}
+             for i in range(team_count)]
+    hs.write_teams(teams)
+    hs.write_settings(settings)
+    hs.write_config(config)
+    return workdir
+
+def remove_workdir(workdir, keep=False):
+    os.chdir(here)
+    if keep:
+        print(f"Kept {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def serve_app():
+    # Returns the server and its base URL; the server runs on a daemon thread
+    server = make_server('127.0.0.1', 0, hs.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+def quiet_access_log():
+    # One access log line per request would drown the reports
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
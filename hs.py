@@ -2,14 +2,21 @@ import threading
 import json
 import time
 import os
-from flask import Flask, render_template_string, request, redirect, url_for
+from flask import Flask, render_template_string, request, redirect, url_for, jsonify, abort
 import pygame
 import multiprocessing
 import portalocker  # For file locking
 import math
-from sacn import sACNsender
 from gtts import gTTS  # For text-to-speech
 import tempfile  # For creating temporary files
+import uuid
+import re
+from score_pipeline import ScorePipeline, Sink
+from score_history import ScoreHistory
+from osc_listener import OscListener
+from output_hub import OutputHub, SacnDevice, WledDevice
+from replication import ReplicationMaster, ReplicationFollower
+from supervisor import Supervisor, Role, beat
 
 # Initialize teams and save to a JSON file if not present
 initial_teams = [
@@ -19,79 +26,241 @@ initial_teams = [
     {'name': 'Green', 'score': 0, 'color': [0, 255, 0]}
 ]
 
+# Colours handed out to teams added at runtime without an explicit colour
+team_color_palette = [
+    [255, 0, 0], [0, 0, 255], [255, 255, 0], [0, 255, 0],
+    [255, 0, 255], [0, 255, 255], [255, 128, 0], [128, 0, 255]
+]
+
 # Default sACN IP address for WLED
 sacn_ip_address = '10.0.0.162'
 
+# Configuration of new games: no sACN or WLED output until one is set
+no_output_config = {'sacn_ip': '', 'wled_ip': ''}
+
+# Number of pixels on the LED strip driven over sACN
+sacn_pixel_count = 133
+
 # Initialize sound and TTS settings
 sound_enabled = True
 tts_enabled = True
 sound_effect_file_add = 'point_add.wav'       # Make sure this file exists
 sound_effect_file_subtract = 'point_taken.wav'  # Make sure this file exists
 
+# Each extra game (room) keeps its own JSON files in games/<game_id>/,
+# the default game uses the files next to this script
+games_dir = 'games'
+default_game_id = 'default'
+game_id_pattern = re.compile(r'[A-Za-z0-9_-]{1,64}')  # Use fullmatch: $ would allow a trailing newline
+
 # Initialize Pygame and mixer
 pygame.init()
 pygame.mixer.init()
 
+# Game (room) helpers
+def is_default_game(game_id):
+    return game_id is None or game_id == default_game_id
+
+def game_file(game_id, filename):
+    # Path of one of a game's JSON files
+    if is_default_game(game_id):
+        return filename
+    return os.path.join(games_dir, game_id, filename)
+
+def game_exists(game_id):
+    if is_default_game(game_id):
+        return True
+    return bool(game_id_pattern.fullmatch(game_id)) and os.path.isdir(os.path.join(games_dir, game_id))
+
+def list_games():
+    games = [default_game_id]
+    if os.path.isdir(games_dir):
+        games += sorted(name for name in os.listdir(games_dir) if game_exists(name))
+    return games
+
 # Save initial teams to JSON file if not present
-def initialize_teams():
+def initialize_teams(game_id=None):
+    if not is_default_game(game_id):
+        if not game_id_pattern.fullmatch(game_id):
+            raise ValueError(f"Invalid game name '{game_id}'")
+        os.makedirs(os.path.join(games_dir, game_id), exist_ok=True)
+
     try:
-        with open('teams.json', 'x') as f:
+        with open(game_file(game_id, 'teams.json'), 'x') as f:
             json.dump(initial_teams, f)
     except FileExistsError:
         pass  # File already exists
 
     # Initialize settings.json if not present
     try:
-        with open('settings.json', 'x') as f:
+        with open(game_file(game_id, 'settings.json'), 'x') as f:
             json.dump({'sound_enabled': True, 'tts_enabled': True}, f)
     except FileExistsError:
         pass  # File already exists
 
+    # A new game starts with its LED outputs off, so it never drives the
+    # default room's controllers until its own are set
+    if not is_default_game(game_id):
+        try:
+            with open(game_file(game_id, 'config.json'), 'x') as f:
+                json.dump(no_output_config, f)
+        except FileExistsError:
+            pass  # File already exists
+
 # File read/write functions with locking
-def read_teams():
-    with portalocker.Lock('teams.json', 'r', timeout=5) as f:
+def read_teams(game_id=None):
+    with portalocker.Lock(game_file(game_id, 'teams.json'), 'r', timeout=5) as f:
         return json.load(f)
 
-def write_teams(teams):
-    with portalocker.Lock('teams.json', 'w', timeout=5) as f:
+def read_teams_if_changed(game_id, stamp):
+    # Renderers poll the teams every frame. Returns (teams, stamp), with teams
+    # None when the file hasn't changed since stamp, so an idle frame costs one
+    # stat(). The shared lock is never waited for: a frame that meets the
+    # writer keeps its last teams and tries again on the next frame.
+    path = game_file(game_id, 'teams.json')
+    stat = os.stat(path)
+    new_stamp = (stat.st_mtime_ns, stat.st_size)
+    if new_stamp == stamp:
+        return None, stamp
+    try:
+        with portalocker.Lock(path, 'r', timeout=0, fail_when_locked=True,
+                              flags=portalocker.LockFlags.SHARED | portalocker.LockFlags.NON_BLOCKING) as f:
+            teams = json.load(f)
+    except portalocker.LockException:
+        return None, stamp
+    if time.time_ns() - stat.st_mtime_ns < 100_000_000:
+        new_stamp = None  # Written just now; another write may follow with the same mtime and size
+    return teams, new_stamp
+
+def write_teams(teams, game_id=None):
+    # Readers hold the lock only for a parse, so retry often rather than every 0.25 s
+    with portalocker.Lock(game_file(game_id, 'teams.json'), 'w', timeout=5, check_interval=0.005) as f:
         json.dump(teams, f)
+        f.flush()  # The lock is released before the file is closed
 
-def read_config():
+def read_config(game_id=None):
     try:
-        with portalocker.Lock('config.json', 'r', timeout=5) as f:
+        with portalocker.Lock(game_file(game_id, 'config.json'), 'r', timeout=5) as f:
             return json.load(f)
     except FileNotFoundError:
+        if not is_default_game(game_id):
+            return dict(no_output_config)
         return {'sacn_ip': sacn_ip_address}  # Default configuration
 
-def write_config(config):
-    with portalocker.Lock('config.json', 'w', timeout=5) as f:
+def write_config(config, game_id=None):
+    with portalocker.Lock(game_file(game_id, 'config.json'), 'w', timeout=5) as f:
         json.dump(config, f)
+        f.flush()  # The lock is released before the file is closed
 
 # Functions to read/write settings
-def read_settings():
+def read_settings(game_id=None):
     try:
-        with portalocker.Lock('settings.json', 'r', timeout=5) as f:
+        with portalocker.Lock(game_file(game_id, 'settings.json'), 'r', timeout=5) as f:
             return json.load(f)
     except FileNotFoundError:
         return {'sound_enabled': True, 'tts_enabled': True}
 
-def write_settings(settings):
-    with portalocker.Lock('settings.json', 'w', timeout=5) as f:
+def write_settings(settings, game_id=None):
+    with portalocker.Lock(game_file(game_id, 'settings.json'), 'w', timeout=5) as f:
         json.dump(settings, f)
+        f.flush()  # The lock is released before the file is closed
+
+# Functions to add/remove teams at runtime
+def parse_color(value):
+    # Accept either an [r, g, b] list or a '#rrggbb' string from a colour picker.
+    # Anything else is refused: a colour of the wrong length shifts every later
+    # team's DMX channels and can't be drawn by pygame.
+    if isinstance(value, str):
+        digits = value[1:] if value.startswith('#') else value
+        if not re.fullmatch(r'[0-9A-Fa-f]{6}', digits):
+            raise ValueError(f"Invalid colour '{value}', expected '#rrggbb'")
+        return [int(digits[i:i + 2], 16) for i in (0, 2, 4)]
+    if not isinstance(value, (list, tuple)) or len(value) != 3 \
+            or any(isinstance(c, bool) or not isinstance(c, int) or not 0 <= c <= 255 for c in value):
+        raise ValueError(f"Invalid colour {value!r}, expected three values from 0 to 255")
+    return list(value)
+
+def add_team(teams, name, color=None, score=0):
+    if color is None:
+        color = team_color_palette[len(teams) % len(team_color_palette)]
+    teams.append({'id': uuid.uuid4().hex[:8], 'name': name, 'score': max(0, int(score)),
+                  'color': parse_color(color)})
+    return teams
+
+def assign_team_ids(teams):
+    # Teams keep their id through renames and other teams' removal, so the
+    # score history can follow them; teams saved before ids existed are
+    # numbered by position, which is how their history samples are keyed
+    for i, team in enumerate(teams):
+        team.setdefault('id', str(i + 1))
+    return teams
+
+def remove_team(teams, team_index):
+    if team_index < 0 or team_index >= len(teams):
+        raise IndexError(f"No team at index {team_index}")
+    del teams[team_index]
+    return teams
+
+# Score mutations, all changes to team scores go through these so every
+# output sees each new state exactly once
+def load_game_teams(game_id):
+    teams = assign_team_ids(read_teams(game_id))
+    score_history.record(game_id, teams)  # Starting point of the history
+    return teams
+
+def copy_teams(teams):
+    # Teams are flat dicts apart from the colour list
+    return [dict(team, color=list(team['color'])) for team in teams]
+
+score_pipeline = ScorePipeline(load_game_teams, copy_teams)
+
+def adjust_team_score(game_id, team_index, points, sound_enabled=True, tts_enabled=True):
+    def change(teams):
+        old_score = teams[team_index]['score']
+        teams[team_index]['score'] = max(0, old_score + points)  # Prevent negative scores
+        return {'type': 'adjust', 'team_index': team_index, 'name': teams[team_index]['name'],
+                'points': points, 'change': teams[team_index]['score'] - old_score,
+                'sound': sound_enabled, 'tts': tts_enabled}
+    return score_pipeline.mutate(game_id, change)
+
+def set_team_names_and_scores(game_id, names, scores):
+    def change(teams):
+        for i in range(len(teams)):
+            teams[i]['name'] = names[i]
+            teams[i]['score'] = max(0, int(scores[i]))
+    return score_pipeline.mutate(game_id, change, {'type': 'set_teams'})
+
+def reset_scores(game_id):
+    def change(teams):
+        for team in teams:
+            team['score'] = 0
+    return score_pipeline.mutate(game_id, change, {'type': 'reset'})
+
+def add_game_team(game_id, name, color=None, score=0):
+    return score_pipeline.mutate(game_id, lambda teams: add_team(teams, name, color, score), {'type': 'add_team'})
+
+def remove_game_team(game_id, team_index):
+    return score_pipeline.mutate(game_id, lambda teams: remove_team(teams, team_index), {'type': 'remove_team'})
 
 # Flask App
 app = Flask(__name__)
 
 @app.route('/', methods=['GET', 'POST'])
-def index():
+@app.route('/game/<game_id>/', methods=['GET', 'POST'])
+def index(game_id=None):
+    if not game_exists(game_id):
+        abort(404)
+    if is_default_game(game_id):
+        game_id = None
+
     # Read current teams
     try:
-        teams = read_teams()
+        _, teams = score_pipeline.snapshot(game_id)
     except Exception as e:
         return f"Error reading teams: {e}", 500
 
     # Read settings
-    settings = read_settings()
+    settings = read_settings(game_id)
     sound_enabled = settings['sound_enabled']
     tts_enabled = settings['tts_enabled']
 
@@ -103,28 +272,9 @@ def index():
                 action = request.form.get('action')
 
                 if action:
-                    points = int(action)
-                    old_score = teams[team_index]['score']
-                    teams[team_index]['score'] += points
-                    if teams[team_index]['score'] < 0:
-                        teams[team_index]['score'] = 0  # Prevent negative scores
-
-                    # Save updated teams to JSON file
-                    write_teams(teams)
-
-                    # Update sACN after score adjustment
-                    update_sacn()
-
-                    # Play sound effect if enabled
-                    if sound_enabled:
-                        play_sound_effect(points)
-
-                    # Announce score change via TTS if enabled
-                    if tts_enabled:
-                        score_change = teams[team_index]['score'] - old_score
-                        announce_score_change(teams[team_index]['name'], score_change)
-
-                    return redirect(url_for('index'))
+                    # Saving, LEDs, sound and TTS are handled by the pipeline sinks
+                    adjust_team_score(game_id, team_index, int(action), sound_enabled, tts_enabled)
+                    return redirect(url_for('index', game_id=game_id))
                 else:
                     return "Invalid request.", 400
             except Exception as e:
@@ -134,28 +284,28 @@ def index():
             try:
                 team_index = int(request.form.get('team_index'))
                 if tts_enabled:
-                    announce_team_score(teams[team_index])
-                return redirect(url_for('index'))
+                    announce_game_team(game_id, team_index)
+                return redirect(url_for('index', game_id=game_id))
             except Exception as e:
                 return f"Error announcing team score: {e}", 500
         elif 'announce_all' in request.form:
             # Announce all teams' scores
             try:
                 if tts_enabled:
-                    announce_all_scores(teams)
-                return redirect(url_for('index'))
+                    announce_game(game_id)
+                return redirect(url_for('index', game_id=game_id))
             except Exception as e:
                 return f"Error announcing all scores: {e}", 500
         elif 'toggle_sound' in request.form:
             # Toggle sound effect setting
             settings['sound_enabled'] = not sound_enabled
-            write_settings(settings)
-            return redirect(url_for('index'))
+            write_settings(settings, game_id)
+            return redirect(url_for('index', game_id=game_id))
         elif 'toggle_tts' in request.form:
             # Toggle TTS setting
             settings['tts_enabled'] = not tts_enabled
-            write_settings(settings)
-            return redirect(url_for('index'))
+            write_settings(settings, game_id)
+            return redirect(url_for('index', game_id=game_id))
         else:
             return "Invalid request.", 400
     else:
@@ -163,7 +313,7 @@ def index():
         return render_template_string('''
             <!doctype html>
             <title>Team Scores</title>
-            <h1>Team Scores</h1>
+            <h1>Team Scores{{ ' - ' + game_id if game_id else '' }}</h1>
 
             <h2>Adjust Scores:</h2>
             <table>
@@ -208,54 +358,77 @@ def index():
                 <button type="submit">{{ 'Disable' if tts_enabled else 'Enable' }} Text-to-Speech</button>
             </form>
 
-            <p><a href="{{ url_for('config') }}">Go to Configuration Page</a></p>
-        ''', teams=teams, sound_enabled=sound_enabled, tts_enabled=tts_enabled)
+            <p><a href="{{ url_for('config', game_id=game_id) }}">Go to Configuration Page</a></p>
+            <p><a href="{{ url_for('games') }}">All Games</a></p>
+        ''', teams=teams, sound_enabled=sound_enabled, tts_enabled=tts_enabled, game_id=game_id)
 
 @app.route('/config', methods=['GET', 'POST'])
-def config():
+@app.route('/game/<game_id>/config', methods=['GET', 'POST'])
+def config(game_id=None):
+    if not game_exists(game_id):
+        abort(404)
+    if is_default_game(game_id):
+        game_id = None
+
     # Read current teams
     try:
-        teams = read_teams()
+        _, teams = score_pipeline.snapshot(game_id)
     except Exception as e:
         return f"Error reading teams: {e}", 500
 
-    config = read_config()
+    config = read_config(game_id)
     current_sacn_ip = config['sacn_ip']
+    current_wled_ip = config.get('wled_ip', '')
 
     if request.method == 'POST':
         if 'set_teams' in request.form:
             # Manually set the scores and names
             try:
-                for i in range(len(teams)):
-                    name_key = f'name_{i}'
-                    score_key = f'score_{i}'
-                    teams[i]['name'] = request.form[name_key]
-                    teams[i]['score'] = max(0, int(request.form[score_key]))
-                # Save updated teams to JSON file
-                write_teams(teams)
-                return redirect(url_for('config'))
+                names = [request.form[f'name_{i}'] for i in range(len(teams))]
+                scores = [int(request.form[f'score_{i}']) for i in range(len(teams))]
+                set_team_names_and_scores(game_id, names, scores)
+                return redirect(url_for('config', game_id=game_id))
             except Exception as e:
                 return f"Error setting teams: {e}", 500
         elif 'reset_scores' in request.form:
             # Reset all team scores to 0
             try:
-                for team in teams:
-                    team['score'] = 0
-                # Save updated teams to JSON file
-                write_teams(teams)
-
-                # Update sACN after resetting scores
-                update_sacn()
-
-                return redirect(url_for('config'))
+                reset_scores(game_id)
+                return redirect(url_for('config', game_id=game_id))
             except Exception as e:
                 return f"Error resetting scores: {e}", 500
+        elif 'add_team' in request.form:
+            # Add a new team
+            try:
+                name = request.form.get('team_name') or f"Team {len(teams) + 1}"
+                add_game_team(game_id, name, request.form.get('team_color') or None)
+                return redirect(url_for('config', game_id=game_id))
+            except ValueError as e:
+                return f"Error adding team: {e}", 400
+            except Exception as e:
+                return f"Error adding team: {e}", 500
+        elif 'remove_team' in request.form:
+            # Remove an existing team
+            try:
+                remove_game_team(game_id, int(request.form.get('team_index')))
+                return redirect(url_for('config', game_id=game_id))
+            except Exception as e:
+                return f"Error removing team: {e}", 500
+        elif 'open_windows' in request.form:
+            # Open the projector, team and overlay windows for this game
+            open_game_windows(game_id)
+            return redirect(url_for('config', game_id=game_id))
         elif 'set_sacn_ip' in request.form:
             # Set the sACN IP address
             new_ip = request.form.get('sacn_ip')
             config['sacn_ip'] = new_ip
-            write_config(config)
-            return redirect(url_for('config'))
+            write_config(config, game_id)
+            return redirect(url_for('config', game_id=game_id))
+        elif 'set_wled_ip' in request.form:
+            # Set the WLED host, empty to turn WLED output off
+            config['wled_ip'] = request.form.get('wled_ip', '').strip()
+            write_config(config, game_id)
+            return redirect(url_for('config', game_id=game_id))
         else:
             return "Invalid request.", 400
     else:
@@ -263,7 +436,7 @@ def config():
         return render_template_string('''
             <!doctype html>
             <title>Configuration Page</title>
-            <h1>Configuration Page</h1>
+            <h1>Configuration Page{{ ' - ' + game_id if game_id else '' }}</h1>
 
             <h2>Set Team Names and Scores Manually:</h2>
             <form method="post">
@@ -276,6 +449,21 @@ def config():
                 <input type="submit" value="Update Teams">
             </form>
 
+            <h2>Add or Remove Teams:</h2>
+            <form method="post">
+                <input type="hidden" name="add_team" value="true">
+                Name: <input type="text" name="team_name">
+                Colour: <input type="color" name="team_color" value="#ffffff">
+                <input type="submit" value="Add Team">
+            </form>
+            {% for team in teams %}
+            <form method="post" style="display:inline;">
+                <input type="hidden" name="remove_team" value="true">
+                <input type="hidden" name="team_index" value="{{ loop.index0 }}">
+                <button type="submit">Remove {{ team['name'] }}</button>
+            </form>
+            {% endfor %}
+
             <h2>Reset All Scores:</h2>
             <form method="post">
                 <input type="hidden" name="reset_scores" value="true">
@@ -289,11 +477,146 @@ def config():
                 <input type="submit" value="Update sACN IP">
             </form>
 
-            <p><a href="{{ url_for('index') }}">Back to Main Page</a></p>
-        ''', teams=teams, current_sacn_ip=current_sacn_ip)
+            <h2>Set WLED Host:</h2>
+            <form method="post">
+                <input type="hidden" name="set_wled_ip" value="true">
+                Host: <input type="text" name="wled_ip" value="{{ current_wled_ip }}"> (empty to disable)<br><br>
+                <input type="submit" value="Update WLED Host">
+            </form>
+
+            <h2>LED Outputs:</h2>
+            <ul>
+                {% for device in outputs %}
+                <li>{{ device['name'] }}: {{ device['state'] }}, {{ device['sent'] }} sent, {{ device['failed'] }} failed,
+                    {{ device['dropped'] }} dropped{% if device['last_error'] %} ({{ device['last_error'] }}){% endif %}</li>
+                {% endfor %}
+            </ul>
+
+            <h2>Windows:</h2>
+            <ul>
+                {% for window in windows %}
+                <li>{{ window['name'] }}: {{ window['state'] }}, {{ window['restarts'] }} restarts
+                    {%- if window['heartbeat_age'] is not none %}, last frame {{ window['heartbeat_age'] }}s ago{% endif %}
+                    {%- if window['last_exit'] is not none %} (last failure: {{ window['last_exit'] }}){% endif %}</li>
+                {% endfor %}
+            </ul>
+            {% if game_id %}
+            <form method="post">
+                <input type="hidden" name="open_windows" value="true">
+                <input type="submit" value="Open Windows">
+            </form>
+            {% endif %}
+
+            <p><a href="{{ url_for('index', game_id=game_id) }}">Back to Main Page</a></p>
+        ''', teams=teams, current_sacn_ip=current_sacn_ip, current_wled_ip=current_wled_ip,
+           outputs=output_hub.status().get(game_id, []), windows=window_status(game_id), game_id=game_id)
+
+@app.route('/games', methods=['GET', 'POST'])
+def games():
+    if request.method == 'POST':
+        # Create a new game with its own teams, settings and config
+        game_id = request.form.get('game_id', '').strip()
+        try:
+            initialize_teams(game_id)
+        except Exception as e:
+            return f"Error creating game: {e}", 400
+        return redirect(url_for('index', game_id=game_id))
+
+    return render_template_string('''
+        <!doctype html>
+        <title>Games</title>
+        <h1>Games</h1>
+        <ul>
+            {% for game in games %}
+            <li><a href="{{ url_for('index', game_id=None if game == default_game_id else game) }}">{{ game }}</a></li>
+            {% endfor %}
+        </ul>
+
+        <h2>New Game:</h2>
+        <form method="post">
+            Name: <input type="text" name="game_id" pattern="[A-Za-z0-9_-]+">
+            <input type="submit" value="Create Game">
+        </form>
+    ''', games=list_games(), default_game_id=default_game_id)
+
+@app.route('/api/teams', methods=['GET', 'POST'])
+@app.route('/game/<game_id>/api/teams', methods=['GET', 'POST'])
+def api_teams(game_id=None):
+    if not game_exists(game_id):
+        abort(404)
+    if is_default_game(game_id):
+        game_id = None
+
+    try:
+        _, teams = score_pipeline.snapshot(game_id)
+    except Exception as e:
+        return jsonify({'error': f"Error reading teams: {e}"}), 500
+
+    if request.method == 'POST':
+        # Add a team from a JSON body: {"name": ..., "color": [r, g, b], "score": 0}
+        data = request.get_json(silent=True) or {}
+        try:
+            _, teams = add_game_team(game_id, data.get('name') or f"Team {len(teams) + 1}",
+                                     data.get('color'), data.get('score', 0))
+        except Exception as e:
+            return jsonify({'error': f"Error adding team: {e}"}), 400
+        return jsonify(teams), 201
+    return jsonify(teams)
+
+@app.route('/api/teams/<int:team_index>', methods=['DELETE'])
+@app.route('/game/<game_id>/api/teams/<int:team_index>', methods=['DELETE'])
+def api_remove_team(team_index, game_id=None):
+    if not game_exists(game_id):
+        abort(404)
+    if is_default_game(game_id):
+        game_id = None
+
+    try:
+        _, teams = remove_game_team(game_id, team_index)
+    except IndexError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': f"Error removing team: {e}"}), 500
+    return jsonify(teams)
+
+@app.route('/api/history')
+@app.route('/game/<game_id>/api/history')
+def api_history(game_id=None):
+    # Scores over time and statistics, optionally limited to ?start=&end= (epoch seconds)
+    if not game_exists(game_id):
+        abort(404)
+    if is_default_game(game_id):
+        game_id = None
+
+    try:
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        points = max(2, min(request.args.get('points', 200, type=int), 5000))
+        return jsonify(score_history.query(game_id, start, end, points))
+    except Exception as e:
+        return jsonify({'error': f"Error reading history: {e}"}), 500
+
+@app.route('/api/outputs')
+def api_outputs():
+    # State of every LED device, per game
+    return jsonify({game_id or default_game_id: devices for game_id, devices in output_hub.status().items()})
+
+@app.route('/api/windows')
+def api_windows():
+    # Health and restart counts of every window process, per game
+    games = {key[0] for key in window_supervisor.keys()}
+    return jsonify({game_id or default_game_id: window_status(game_id) for game_id in games})
+
+@app.route('/api/replication')
+def api_replication():
+    # Role of this node and how far replication has got
+    if replication_node is None:
+        return jsonify({'role': None})
+    return jsonify(replication_node.status())
 
 def run_flask():
-    app.run(debug=False)
+    # Set "web_port" in config.json to run several nodes on one host
+    app.run(debug=False, port=read_config().get('web_port', 5000))
 
 def create_flask_thread():
     flask_thread = threading.Thread(target=run_flask)
@@ -301,24 +624,72 @@ def create_flask_thread():
     flask_thread.start()
     return flask_thread
 
-def run_main_pygame():
+# Fonts by size, shared by every renderer of a process. Preloaded before the
+# window processes start, so on Linux, where they are forked, they inherit the
+# fonts ready to use. Fonts can't be pickled, so processes spawned on Windows
+# and macOS start with an empty cache and load the few sizes they need on
+# their first frame (a few milliseconds).
+font_cache = {}
+MAX_FONT_SIZE = 100
+MIN_FONT_SIZE = 10
+
+def cached_font(size):
+    font = font_cache.get(size)
+    if font is None:
+        font = font_cache[size] = pygame.font.SysFont(None, size)
+    return font
+
+def preload_fonts():
+    for size in range(MIN_FONT_SIZE, MAX_FONT_SIZE + 1):
+        cached_font(size)
+
+def fit_font_size(fonts, text, max_width, max_height, max_size, min_size):
+    # Binary search the largest font size whose text fits, measuring with
+    # font.size() so only the chosen size is ever rendered
+    best_size = None
+    low, high = min_size, max_size
+    while low <= high:
+        size = (low + high) // 2
+        if size not in fonts:
+            fonts[size] = pygame.font.SysFont(None, size)
+        text_width, text_height = fonts[size].size(text)
+        if text_width <= max_width and text_height <= max_height:
+            best_size = size
+            low = size + 1
+        else:
+            high = size - 1
+    return best_size
+
+def fit_text_outline(fonts, outlines, text, max_width, max_height, max_size, min_size):
+    best_size = fit_font_size(fonts, text, max_width, max_height, max_size, min_size)
+    if best_size is None:
+        return None
+    key = (text, best_size)
+    if key not in outlines:
+        outlines[key] = create_text_outline(fonts[best_size], text, (0, 0, 0), (255, 255, 255))
+    return outlines[key]
+
+def run_main_pygame(game_id=None, teams=None, heartbeat=None):
+    # teams, when given, are the current scores of a restarted projector
     pygame.init()
     screen = pygame.display.set_mode((800, 600), pygame.RESIZABLE)
-    pygame.display.set_caption('Projector')
+    pygame.display.set_caption(window_caption('Projector', game_id))
     screen_width, screen_height = screen.get_size()
 
     # Font settings
-    MAX_FONT_SIZE = 100
-    MIN_FONT_SIZE = 10
-    score_font = pygame.font.SysFont(None, 24)  # Fixed size for scores
+    score_font = cached_font(24)  # Fixed size for scores
+    fonts = font_cache
+    outlines = {}
 
     # Initialize teams
-    try:
-        teams = read_teams()
-    except Exception as e:
-        print(f"Error reading teams: {e}")
-        return
+    if teams is None:
+        try:
+            teams = read_teams(game_id)
+        except Exception as e:
+            print(f"Error reading teams: {e}")
+            return
     prev_teams = [team.copy() for team in teams]
+    teams_stamp = None
 
     animation_start_time = None
     animation_duration = 1.0  # Animate over one second
@@ -328,6 +699,7 @@ def run_main_pygame():
 
     while running:
         dt = clock.tick(60) / 1000.0  # Delta time in seconds
+        beat(heartbeat)
 
         # Handle events
         for event in pygame.event.get():
@@ -338,21 +710,24 @@ def run_main_pygame():
                 screen_width, screen_height = event.size
                 screen = pygame.display.set_mode((screen_width, screen_height), pygame.RESIZABLE)
 
-        # Read teams from JSON file
+        # Read teams from JSON file when it changed
         try:
-            current_teams = read_teams()
+            current_teams, teams_stamp = read_teams_if_changed(game_id, teams_stamp)
         except Exception as e:
             print(f"Error reading teams: {e}")
             continue  # Skip this frame
 
         # Check if teams have changed
-        if current_teams != teams:
+        if current_teams is not None and current_teams != teams:
             prev_teams = [team.copy() for team in teams]
             teams = [team.copy() for team in current_teams]
             animation_start_time = time.time()
 
-            # Update sACN when teams change
-            update_sacn()
+            # Teams added at runtime grow from zero, removed teams are dropped
+            if len(prev_teams) != len(teams):
+                prev_teams = prev_teams[:len(teams)]
+                prev_teams += [dict(team, score=0) for team in teams[len(prev_teams):]]
+                outlines.clear()
 
         # Calculate total scores
         total_prev_score = sum([max(0, team['score']) for team in prev_teams])
@@ -400,28 +775,15 @@ def run_main_pygame():
             pygame.draw.rect(screen, team_color, (x_offset, 0, team_width, screen_height))
 
             # Try to render the team name within the area
-            font_size = MAX_FONT_SIZE
-            text_fits = False
             team_text = f"{team_name} {int(current_score)}"
 
             try:
-                while font_size >= MIN_FONT_SIZE:
-                    team_font = pygame.font.SysFont(None, font_size)
-                    text_surface = team_font.render(team_text, True, (0, 0, 0))
-
-                    # Create text outline
-                    outline_surface = create_text_outline(team_font, team_text, (0, 0, 0), (255, 255, 255))
-
-                    text_width, text_height = text_surface.get_size()
-
-                    if text_width <= team_width and text_height <= screen_height:
-                        text_fits = True
-                        break
-                    else:
-                        font_size -= 1
+                outline_surface = fit_text_outline(fonts, outlines, team_text, team_width, screen_height,
+                                                   MAX_FONT_SIZE, MIN_FONT_SIZE)
 
-                if text_fits:
+                if outline_surface is not None:
                     # The text fits, blit it onto the screen
+                    text_width, text_height = outline_surface.get_size()
                     text_x = x_offset + (team_width - text_width) / 2
                     text_y = (screen_height - text_height) / 2
                     screen.blit(outline_surface, (text_x, text_y))
@@ -452,8 +814,14 @@ def run_main_pygame():
             animation_start_time = None
             prev_teams = [team.copy() for team in teams]
 
+            # Drop outlines rendered for intermediate animation widths
+            outlines.clear()
+
     pygame.quit()
 
+def window_caption(title, game_id):
+    return title if is_default_game(game_id) else f"{title} ({game_id})"
+
 def create_text_outline(font, message, text_color, outline_color):
     # Render the text multiple times to create an outline
     base = font.render(message, True, text_color)
@@ -466,20 +834,111 @@ def create_text_outline(font, message, text_color, outline_color):
     outline.blit(base, (1, 1))
     return outline
 
-def create_team_windows():
-    processes = []
-    positions = [(50, 50), (400, 50), (50, 500), (400, 500)]  # Positions for windows
-    for i in range(len(initial_teams)):
-        p = multiprocessing.Process(target=run_team_window, args=(i, positions[i % len(positions)]))
-        p.start()
-        processes.append(p)
-    return processes
-
-def run_team_window(team_index, position):
-    os.environ['SDL_VIDEO_WINDOW_POS'] = f"{position[0]},{position[1]}"
+def team_window_rect(team_index, team_count, desktop_size, cell=(350, 450), window=(300, 400), margin=50):
+    # Tile the team windows over the desktop, shrinking them (keeping their
+    # shape) when they don't fit. The grid is laid out for the next power of
+    # two teams, at least 4, so adding a team rarely moves the others.
+    capacity = 4
+    while capacity < team_count:
+        capacity *= 2
+    available_width = max(desktop_size[0] - 2 * margin, cell[0])
+    available_height = max(desktop_size[1] - 2 * margin, cell[1])
+    best_scale, columns = 0, 1
+    for candidate in range(1, capacity + 1):
+        rows = -(-capacity // candidate)
+        scale = min(available_width / (candidate * cell[0]), available_height / (rows * cell[1]), 1.0)
+        if scale >= best_scale:  # Ties go to more columns, like the original single row
+            best_scale, columns = scale, candidate
+    x = margin + (team_index % columns) * int(cell[0] * best_scale)
+    y = margin + (team_index // columns) * int(cell[1] * best_scale)
+    return x, y, int(window[0] * best_scale), int(window[1] * best_scale)
+
+# Window processes of every open game, keyed by (game_id, role) or
+# (game_id, 'team', team_index), restarted when they crash or hang
+window_supervisor = Supervisor()
+
+def warm_window_state(game_id):
+    # A restarted window starts from the current scores instead of the file;
+    # they are passed as arguments, so this works with fork and spawn alike
+    return lambda: {'teams': score_pipeline.snapshot(game_id)[1]}
+
+def start_team_window(team_index, game_id=None):
+    return window_supervisor.add((game_id, 'team', team_index), Role(
+        window_caption(f"Team {team_index + 1}", game_id), run_team_window,
+        (team_index, game_id), warm=warm_window_state(game_id)))
+
+def sync_team_windows(supervisor):
+    # Start windows for teams added at runtime and close windows of removed ones.
+    # Windows closed by hand keep their (stopped) role, so they stay closed.
+    keys = supervisor.keys()
+    for game_id in {key[0] for key in keys}:
+        team_count = len(score_pipeline.snapshot(game_id)[1])
+        for team_index in range(team_count):
+            if (game_id, 'team', team_index) not in keys:
+                start_team_window(team_index, game_id)
+        for key in keys:
+            if key[0] == game_id and key[1] == 'team' and key[2] >= team_count:
+                supervisor.remove(key)
+
+def open_game_windows(game_id=None, projector=True):
+    # Team windows, overlay and projector of a game, each in its own process.
+    # Closing a game's projector closes the rest of its windows.
+    warm = warm_window_state(game_id)
+    if projector:
+        window_supervisor.add((game_id, 'projector'), Role(
+            window_caption('Projector', game_id), run_main_pygame, (game_id,), warm=warm,
+            on_exit=lambda role: close_game_windows(game_id)))
+    window_supervisor.add((game_id, 'overlay'), Role(
+        window_caption('OB overlay', game_id), run_pie_chart_window, (game_id,), warm=warm))
+    sync_team_windows(window_supervisor)
+
+def close_game_windows(game_id):
+    for key in window_supervisor.keys():
+        if key[0] == game_id:
+            window_supervisor.remove(key)
+
+def window_status(game_id):
+    return [role for _, role in sorted(
+        (key[1:], role) for key, role in window_supervisor.status().items() if key[0] == game_id)]
+
+def team_text_surface(text_cache, text, window_size):
+    # Name and score as large as fits the window, rendered once per (text, size)
+    window_width, window_height = window_size
+    size = fit_font_size(font_cache, text, window_width * 0.9, window_height / 6,
+                         max(MIN_FONT_SIZE, window_height // 6), MIN_FONT_SIZE) or MIN_FONT_SIZE
+    key = (text, size)
+    if key not in text_cache:
+        if len(text_cache) > 32:
+            text_cache.clear()  # Old scores and window sizes
+        text_cache[key] = cached_font(size).render(text, True, (255, 255, 255))
+    return text_cache[key]
+
+def draw_team_region(surface, region, fill_top, color, text_surface, text_rect):
+    # Redraw one region of a team window: background, fill from fill_top down, text
+    surface.fill((0, 0, 0), region)
+    filled = region.clip(pygame.Rect(0, fill_top, surface.get_width(), surface.get_height() - fill_top))
+    if filled.height > 0:
+        surface.fill(color, filled)
+    if region.colliderect(text_rect):
+        surface.set_clip(region)
+        surface.blit(text_surface, text_rect)
+        surface.set_clip(None)
+
+def run_team_window(team_index, game_id=None, teams=None, heartbeat=None):
+    # teams, when given, are the current scores of a restarted window
+    if teams is None:
+        try:
+            teams = read_teams(game_id)
+        except Exception as e:
+            print(f"Error reading teams: {e}")
+            return
+
+    # Place and size the window for the team count and the desktop it opens on
     pygame.init()
-    team_window = pygame.display.set_mode((300, 400), pygame.RESIZABLE)
-    pygame.display.set_caption(f"Team {team_index + 1}")
+    x, y, width, height = team_window_rect(team_index, len(teams), pygame.display.get_desktop_sizes()[0])
+    os.environ['SDL_VIDEO_WINDOW_POS'] = f"{x},{y}"
+    team_window = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+    pygame.display.set_caption(window_caption(f"Team {team_index + 1}", game_id))
 
     team = None
     prev_team = None
@@ -489,8 +948,19 @@ def run_team_window(team_index, position):
     clock = pygame.time.Clock()
     running = True
 
+    # What is on screen, so a frame only redraws what changed
+    text_cache = {}
+    text_key = None  # (text, window size) of text_surface
+    text_surface = None
+    text_rect = None
+    drawn_color = None
+    drawn_fill_top = None
+    redraw = True
+    teams_stamp = None
+
     while running:
         dt = clock.tick(60) / 1000.0  # Delta time in seconds
+        beat(heartbeat)
 
         # Handle events
         for event in pygame.event.get():
@@ -500,16 +970,28 @@ def run_team_window(team_index, position):
                 # Adjust the window size
                 window_width, window_height = event.size
                 team_window = pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
-            else:
-                window_width, window_height = team_window.get_size()
+                redraw = True
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                redraw = True  # The window was uncovered
 
-        # Read team from JSON file
+        # Read teams from JSON file when it changed, keeping the last known
+        # teams if that fails
+        current_teams = None
         try:
-            teams = read_teams()
-            current_team = teams[team_index]
+            current_teams, teams_stamp = read_teams_if_changed(game_id, teams_stamp)
+            if current_teams is not None:
+                teams = current_teams
         except Exception as e:
             print(f"Error reading teams: {e}")
-            continue  # Skip this frame
+
+        # Nothing changed and nothing is moving: what is on screen is current
+        if current_teams is None and team is not None and animation_start_time is None and not redraw:
+            continue
+
+        # The team was removed, close this window
+        if team_index >= len(teams):
+            break
+        current_team = teams[team_index]
 
         # Calculate total score
         total_score = sum([max(0, t['score']) for t in teams])
@@ -539,28 +1021,39 @@ def run_team_window(team_index, position):
             t = 1.0
             interp_percentage = current_percentage
 
-        # Draw background
-        team_window.fill((0, 0, 0))
-
         # Calculate fill height
         window_width, window_height = team_window.get_size()
-        fill_height = interp_percentage * window_height
-
-        # Draw filled color from bottom to top
-        pygame.draw.rect(team_window, team['color'], (0, window_height - fill_height, window_width, fill_height))
+        fill_top = window_height - int(interp_percentage * window_height)
 
-        # Render team name and score
-        try:
-            font = pygame.font.SysFont(None, 48)
-            text = f"{team['name']} {int(current_score)}"
-            text_surface = font.render(text, True, (255, 255, 255))
+        # Fit the team name and score to the window when either changes
+        text = f"{team['name']} {int(current_score)}"
+        if (text, (window_width, window_height)) != text_key:
+            try:
+                text_surface = team_text_surface(text_cache, text, (window_width, window_height))
+            except Exception as e:
+                print(f"Error rendering text for team '{team['name']}': {e}")
+                continue
+            text_key = (text, (window_width, window_height))
             text_rect = text_surface.get_rect(center=(window_width / 2, window_height / 2))
-            team_window.blit(text_surface, text_rect)
-        except Exception as e:
-            print(f"Error rendering text for team '{team['name']}': {e}")
-
-        # Update display
-        pygame.display.flip()
+            redraw = True
+        if team['color'] != drawn_color:
+            redraw = True
+
+        if redraw:
+            # Draw everything
+            draw_team_region(team_window, team_window.get_rect(), fill_top, team['color'], text_surface, text_rect)
+            pygame.display.flip()
+            redraw = False
+        elif fill_top != drawn_fill_top:
+            # Only the strip between the old and new fill height changed, and the
+            # text if the edge of the fill passes behind it
+            strip = pygame.Rect(0, min(fill_top, drawn_fill_top), window_width, abs(fill_top - drawn_fill_top))
+            regions = [strip] + ([text_rect] if strip.colliderect(text_rect) else [])
+            for region in regions:
+                draw_team_region(team_window, region, fill_top, team['color'], text_surface, text_rect)
+            pygame.display.update(regions)
+        drawn_color = team['color']
+        drawn_fill_top = fill_top
 
         # Check if animation is complete
         if animation_start_time is not None and t >= 1.0:
@@ -569,30 +1062,102 @@ def run_team_window(team_index, position):
 
     pygame.quit()
 
-def run_pie_chart_window():
+# Angular resolution of the cached pie outline (degrees between points)
+PIE_STEP_DEGREES = 2
+
+def build_pie_outline(center, radius):
+    # Precompute the points around the circle once per window size so slices
+    # can be assembled every frame without any trigonometry
+    cx, cy = center
+    return [(cx + radius * math.cos(math.radians(angle)), cy + radius * math.sin(math.radians(angle)))
+            for angle in range(0, 360 + PIE_STEP_DEGREES, PIE_STEP_DEGREES)]
+
+def pie_slice_polygon(center, radius, outline, start_angle, end_angle):
+    # Build a filled slice from the cached outline plus the two exact edge points
+    cx, cy = center
+    points = [center,
+              (cx + radius * math.cos(math.radians(start_angle)), cy + radius * math.sin(math.radians(start_angle)))]
+    first = int(start_angle // PIE_STEP_DEGREES) + 1
+    last = int(math.ceil(end_angle / PIE_STEP_DEGREES)) - 1
+    points.extend(outline[first:last + 1])
+    points.append((cx + radius * math.cos(math.radians(end_angle)), cy + radius * math.sin(math.radians(end_angle))))
+    return points
+
+def pie_target_angles(teams):
+    # Cumulative end angle of each team's slice
+    total_score = sum([max(0, team['score']) for team in teams])
+    if total_score == 0:
+        total_score = 1  # Avoid division by zero
+
+    target_angles = []
+    start_angle = 0
+    for team in teams:
+        start_angle += max(0, team['score']) / total_score * 360
+        target_angles.append(start_angle)
+    return target_angles
+
+def render_pie_chart(surface, teams, angles, center, radius, outline, label_surfaces):
+    start_angle = 0
+    for i, team in enumerate(teams):
+        end_angle = angles[i]
+
+        # Draw pie slice as a single filled polygon
+        if end_angle - start_angle > 0.01:
+            pygame.draw.polygon(surface, team['color'],
+                                pie_slice_polygon(center, radius, outline, start_angle, end_angle))
+
+        # Display team name and score, only if score is greater than 0
+        if team['score'] > 0:
+            text_surface = label_surfaces[i]
+            mid_angle = math.radians((start_angle + end_angle) / 2)
+            text_x = center[0] + (radius + 30) * math.cos(mid_angle)
+            text_y = center[1] + (radius + 30) * math.sin(mid_angle)
+            surface.blit(text_surface, text_surface.get_rect(center=(text_x, text_y)))
+
+        # Update start angle
+        start_angle = end_angle
+
+def run_pie_chart_window(game_id=None, teams=None, heartbeat=None):
+    # teams, when given, are the current scores of a restarted overlay, which
+    # is shown as it was instead of animating in from an empty pie
     pygame.init()
     pie_window = pygame.display.set_mode((1024, 768), pygame.RESIZABLE)
-    pygame.display.set_caption('OB overlay')
+    pygame.display.set_caption(window_caption('OB overlay', game_id))
 
     background_color = (0, 255, 255)  # Cyan background
 
     # Initialize teams
-    try:
-        teams = read_teams()
-    except Exception as e:
-        print(f"Error reading teams: {e}")
-        return
+    warm = teams is not None
+    if not warm:
+        try:
+            teams = read_teams(game_id)
+        except Exception as e:
+            print(f"Error reading teams: {e}")
+            return
 
     running = True
     clock = pygame.time.Clock()
+    font = cached_font(36)
 
     # Variables to store the current and target angles for animation
-    current_angles = [0] * len(teams)
-    target_angles = [0] * len(teams)
-    animation_speed = 5  # Speed of animation (degrees per frame)
+    target_angles = pie_target_angles(teams)
+    current_angles = list(target_angles) if warm else [0] * len(teams)
+    animation_speed = 300  # Speed of animation (degrees per second)
+
+    # Cached geometry and surfaces, rebuilt only when scores or window size change
+    label_cache = {}
+    label_surfaces = []
+    geometry_size = None
+    center = None
+    radius = 200
+    outline = []
+    frame_surface = None
+    frame_angles = None
+    teams_stamp = None
 
     while running:
         dt = clock.tick(60) / 1000.0  # Delta time in seconds
+        beat(heartbeat)
 
         # Handle events
         for event in pygame.event.get():
@@ -602,126 +1167,161 @@ def run_pie_chart_window():
                 # Adjust the window size
                 pie_window = pygame.display.set_mode(event.size, pygame.RESIZABLE)
 
-        # Read teams from JSON file
+        # Read teams from JSON file when it changed
         try:
-            teams = read_teams()
+            current_teams, teams_stamp = read_teams_if_changed(game_id, teams_stamp)
         except Exception as e:
             print(f"Error reading teams: {e}")
             continue  # Skip this frame
-
-        # Calculate total scores
-        total_score = sum([max(0, team['score']) for team in teams])
-        if total_score == 0:
-            total_score = 1  # Avoid division by zero
-
-        # Calculate target angles for the pie chart
-        start_angle = 0
-        for i, team in enumerate(teams):
-            percentage = max(0, team['score']) / total_score
-            target_angles[i] = start_angle + percentage * 360
-            start_angle = target_angles[i]
-
-        # Interpolate angles towards target angles for animation
+        if current_teams is None:
+            current_teams = teams
+
+        # Recalculate targets and labels only when the scores change
+        if current_teams != teams or not label_surfaces:
+            teams = current_teams
+            target_angles = pie_target_angles(teams)
+
+            # Teams added at runtime start as an empty slice at the end of the pie
+            if len(current_angles) != len(teams):
+                current_angles = current_angles[:len(teams)]
+                current_angles += [current_angles[-1] if current_angles else 0] * (len(teams) - len(current_angles))
+            texts = [f"{team['name']} {team['score']}" for team in teams]
+            for text in texts:
+                if text not in label_cache:
+                    label_cache[text] = create_text_outline(font, text, (0, 0, 0), (255, 255, 255))
+            label_cache = {text: label_cache[text] for text in texts}
+            label_surfaces = [label_cache[text] for text in texts]
+            frame_angles = None
+
+        # Rebuild the pie outline when the window size changes
+        if pie_window.get_size() != geometry_size:
+            geometry_size = pie_window.get_size()
+            center = (300, geometry_size[1] - 300)
+            outline = build_pie_outline(center, radius)
+            frame_surface = pygame.Surface(geometry_size).convert()
+            frame_angles = None
+
+        # Interpolate angles towards target angles using elapsed time
+        step = animation_speed * dt
         for i in range(len(current_angles)):
             if current_angles[i] < target_angles[i]:
-                current_angles[i] = min(current_angles[i] + animation_speed, target_angles[i])
+                current_angles[i] = min(current_angles[i] + step, target_angles[i])
             elif current_angles[i] > target_angles[i]:
-                current_angles[i] = max(current_angles[i] - animation_speed, target_angles[i])
+                current_angles[i] = max(current_angles[i] - step, target_angles[i])
 
-        # Draw background
-        pie_window.fill(background_color)
-
-        # Pie chart parameters
-        center_x = 300
-        center_y = pie_window.get_height() - 300
-        radius = 200
-
-        start_angle = 0
-
-        # Draw pie chart with animated angles
-        for i, team in enumerate(teams):
-            end_angle = current_angles[i]
-
-            # Draw pie slice
-            pygame.draw.arc(pie_window, team['color'], (center_x - radius, center_y - radius, 2 * radius, 2 * radius),
-                            math.radians(start_angle), math.radians(end_angle), radius)
-            pygame.draw.line(pie_window, team['color'], (center_x, center_y),
-                             (center_x + radius * math.cos(math.radians(start_angle)),
-                              center_y + radius * math.sin(math.radians(start_angle))), 2)
-            pygame.draw.line(pie_window, team['color'], (center_x, center_y),
-                             (center_x + radius * math.cos(math.radians(end_angle)),
-                              center_y + radius * math.sin(math.radians(end_angle))), 2)
-
-            # Display team name and score, only if score is greater than 0
-            if team['score'] > 0:
-                font = pygame.font.SysFont(None, 36)
-                text = f"{team['name']} {team['score']}"
-                text_surface = create_text_outline(font, text, (0, 0, 0), (255, 255, 255))
-                text_x = center_x + (radius + 30) * math.cos(math.radians((start_angle + end_angle) / 2))
-                text_y = center_y + (radius + 30) * math.sin(math.radians((start_angle + end_angle) / 2))
-
-                # Avoid placing text too close to the edge
-                text_rect = text_surface.get_rect(center=(text_x, text_y))
-                pie_window.blit(text_surface, text_rect)
-
-            # Update start angle
-            start_angle = end_angle
+        # Redraw the cached frame only while the chart is actually moving
+        if current_angles != frame_angles:
+            frame_surface.fill(background_color)
+            render_pie_chart(frame_surface, teams, current_angles, center, radius, outline, label_surfaces)
+            frame_angles = list(current_angles)
+
+        pie_window.blit(frame_surface, (0, 0))
 
         # Update display
         pygame.display.flip()
 
     pygame.quit()
 
-def start_sacn_sender():
-    config = read_config()
-    sender = sACNsender()
-    sender.start()
-    sender.activate_output(1)
-    sender[1].multicast = False  # Set to unicast mode
-    sender[1].destination = config['sacn_ip']  # Use IP from config
-    return sender
-
-def update_sacn():
-    sender = start_sacn_sender()
-    teams = read_teams()
+# Segment layout used for the original four-team strip
+default_led_segments = [(1, 36), (37, 65), (66, 90), (91, 133)]
 
-    dmx_data = [0] * 133 * 3  # Initialize DMX data for 133 pixels
+def config_pixel_count(game_id=None):
+    return int(read_config(game_id).get('pixel_count', sacn_pixel_count))
 
-    # Define segments for sACN
-    segments = [
-        {'start': 1, 'stop': 36, 'color': teams[0]['color']},
-        {'start': 37, 'stop': 65, 'color': teams[1]['color']},
-        {'start': 66, 'stop': 90, 'color': teams[2]['color']},
-        {'start': 91, 'stop': 133, 'color': teams[3]['color']}
-    ]
+def led_segments(teams, pixel_count):
+    # Use the hand-tuned layout when it matches, otherwise split the strip evenly
+    if len(teams) == len(default_led_segments) and pixel_count == sacn_pixel_count:
+        bounds = default_led_segments
+    else:
+        bounds = []
+        for i in range(len(teams)):
+            start = i * pixel_count // len(teams) + 1
+            stop = (i + 1) * pixel_count // len(teams)
+            bounds.append((start, stop))
+    return [{'start': start, 'stop': stop, 'color': team['color']} for (start, stop), team in zip(bounds, teams)]
 
+def led_fill_fractions(teams):
+    # Share of each team's LED segment that is lit
     total_score = sum([team['score'] for team in teams]) or 1  # Prevent division by zero
-    for i, segment in enumerate(segments):
-        segment_score = teams[i]['score']
-        percent_on = segment_score / total_score
+    fractions = []
+    for team in teams:
+        percent_on = team['score'] / total_score
 
         if percent_on > 0.50:  # If more than 50% of the total score, turn on the whole segment
             percent_on = 1.0
         else:
             percent_on = percent_on * 2
+        fractions.append(percent_on)
+    return fractions
 
+def build_dmx_data(teams, pixel_count):
+    dmx_data = [0] * pixel_count * 3  # Initialize DMX data for every pixel
+
+    # Define segments for sACN
+    segments = led_segments(teams, pixel_count)
+
+    for segment, percent_on in zip(segments, led_fill_fractions(teams)):
         num_pixels_on = int(percent_on * (segment['stop'] - segment['start']))
 
         for pixel in range(segment['start'] - 1, segment['start'] - 1 + num_pixels_on):
             dmx_data[pixel * 3:pixel * 3 + 3] = segment['color']
-
-    # Send sACN data
-    sender[1].dmx_data = dmx_data
-    time.sleep(0.05)  # Wait briefly to ensure data is sent
-    sender.stop()  # Stop sender
+    return dmx_data
+
+def build_wled_percentages(teams):
+    return [percent_on * 100 for percent_on in led_fill_fractions(teams)]
+
+# LED outputs of every game; sACN senders are shared between games by destination
+output_hub = OutputHub()
+
+def output_specs(config):
+    # A game's LED devices: "outputs" in config.json lists them explicitly,
+    # otherwise sacn_ip and wled_ip describe one device each
+    outputs = config.get('outputs')
+    if outputs is None:
+        outputs = []
+        if config.get('sacn_ip'):
+            outputs.append({'type': 'sacn', 'ip': config['sacn_ip']})
+        if config.get('wled_ip'):
+            outputs.append({'type': 'wled', 'host': config['wled_ip']})
+    return outputs
+
+def make_output_device(spec, pixel_count):
+    options = {key: spec[key] for key in ('max_pending', 'retry_min', 'retry_max') if key in spec}
+    if spec['type'] == 'sacn':
+        pixels = int(spec.get('pixel_count', pixel_count))
+        return SacnDevice(f"sACN {spec['ip']}", lambda teams: build_dmx_data(teams, pixels), output_hub,
+                          spec['ip'], int(spec.get('universe', 1)), **options)
+    if spec['type'] == 'wled':
+        return WledDevice(f"WLED {spec['host']}", build_wled_percentages, spec['host'],
+                          float(spec.get('timeout', 1.0)), **options)
+    raise ValueError(f"Unknown output type '{spec['type']}'")
+
+def update_outputs(game_id=None, teams=None):
+    # Hand the teams to every LED device of the game; never waits for a device
+    if teams is None:
+        teams = read_teams(game_id)
+    config = read_config(game_id)
+    specs = output_specs(config)
+    pixel_count = int(config.get('pixel_count', sacn_pixel_count))
+    output_hub.configure(game_id, (json.dumps(specs, sort_keys=True), pixel_count),
+                         lambda: [make_output_device(spec, pixel_count) for spec in specs])
+    output_hub.publish(game_id, teams)
+
+# Sound effects loaded once and shared by every game
+sound_cache = {}
+
+def load_sound(filename):
+    if filename not in sound_cache:
+        sound_cache[filename] = pygame.mixer.Sound(filename)
+    return sound_cache[filename]
 
 # Function to play the appropriate sound effect
 def play_sound_effect(action):
     try:
         if action > 0:
-            sound = pygame.mixer.Sound(sound_effect_file_add)
+            sound = load_sound(sound_effect_file_add)
         else:
-            sound = pygame.mixer.Sound(sound_effect_file_subtract)
+            sound = load_sound(sound_effect_file_subtract)
         sound.play()
         # Wait until the sound has finished playing before returning
         while pygame.mixer.get_busy():
@@ -730,16 +1330,11 @@ def play_sound_effect(action):
         print(f"Error playing sound effect: {e}")
 
 # Function to announce score change using gTTS
-def announce_score_change(team_name, score_change):
-    if score_change > 0:
-        message = f"{team_name} gained {score_change} point{'s' if score_change > 1 else ''}."
-    elif score_change < 0:
-        message = f"{team_name} lost {abs(score_change)} point{'s' if abs(score_change) > 1 else ''}."
-    else:
-        return  # No change
-
+def speak(message):
+    # Generate speech using gTTS and play it; the temporary MP3 is removed
+    # even when generation or playback fails, so long shows don't fill the disk
+    temp_filename = None
     try:
-        # Generate speech using gTTS
         tts = gTTS(text=message, lang='en')
         # Save to a temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
@@ -751,70 +1346,230 @@ def announce_score_change(team_name, score_change):
         # Wait until playback is finished
         while pygame.mixer.music.get_busy():
             pygame.time.Clock().tick(10)
-        # Delete the temporary file
-        os.remove(temp_filename)
     except Exception as e:
         print(f"Error with TTS: {e}")
+    finally:
+        if temp_filename is not None:
+            try:
+                pygame.mixer.music.unload()  # Release the file so it can be deleted
+            except pygame.error:
+                pass  # Mixer not available
+            try:
+                os.remove(temp_filename)
+            except OSError as e:
+                print(f"Error removing TTS file: {e}")
+
+def announce_score_change(team_name, score_change):
+    if score_change > 0:
+        message = f"{team_name} gained {score_change} point{'s' if score_change > 1 else ''}."
+    elif score_change < 0:
+        message = f"{team_name} lost {abs(score_change)} point{'s' if abs(score_change) > 1 else ''}."
+    else:
+        return  # No change
+    speak(message)
 
 # Function to announce individual team score using gTTS
 def announce_team_score(team):
-    message = f"{team['name']} has {team['score']} point{'s' if team['score'] != 1 else ''}."
-    try:
-        tts = gTTS(text=message, lang='en')
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-            temp_filename = fp.name
-            tts.save(temp_filename)
-        pygame.mixer.music.load(temp_filename)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        os.remove(temp_filename)
-    except Exception as e:
-        print(f"Error with TTS: {e}")
+    speak(f"{team['name']} has {team['score']} point{'s' if team['score'] != 1 else ''}.")
 
 # Function to announce all team scores using gTTS
 def announce_all_scores(teams):
     messages = [f"{team['name']} has {team['score']} point{'s' if team['score'] != 1 else ''}." for team in teams]
-    message = " ".join(messages)
+    speak(" ".join(messages))
+
+# Pipeline outputs and how often each may run (seconds)
+persist_interval = 0.05
+leds_interval = 1 / 30
+sound_interval = 0.15
+tts_window = 0.5
+
+def persist_output(game_id, teams, events):
+    write_teams(teams, game_id)
+
+def leds_output(game_id, teams, events):
+    update_outputs(game_id, teams)
+
+def sound_output(game_id, teams, events):
+    # One sound per batch of clicks, for the most recent one
+    adjustments = [event for event in events if event['type'] == 'adjust' and event['sound']]
+    if adjustments:
+        play_sound_effect(adjustments[-1]['points'])
+
+def tts_output(game_id, teams, events):
+    # Merge a burst of clicks into one announcement per team, and repeated
+    # announcement requests into one each; everything is spoken from this
+    # sink's thread, so one message never cuts off another
+    changes = {}
+    announce_ids = set()
+    announce_all = False
+    for event in events:
+        if event['type'] == 'adjust' and event['tts']:
+            changes[event['name']] = changes.get(event['name'], 0) + event['change']
+        elif event['type'] == 'announce':
+            announce_ids.add(event['team_id'])
+        elif event['type'] == 'announce_all':
+            announce_all = True
+    for team_name, score_change in changes.items():
+        announce_score_change(team_name, score_change)
+    if announce_all:
+        announce_all_scores(teams)
+    else:
+        for team in teams:
+            if team['id'] in announce_ids:
+                announce_team_score(team)
+
+def announce_game_team(game_id, team_index):
+    # Announcements are queued on the TTS sink rather than spoken here
+    _, teams = score_pipeline.snapshot(game_id)
+    if team_index < 0 or team_index >= len(teams):
+        raise IndexError(f"No team at index {team_index}")
+    score_pipeline.notify(game_id, {'type': 'announce', 'team_id': teams[team_index]['id']}, 'tts')
+
+def announce_game(game_id):
+    score_pipeline.notify(game_id, {'type': 'announce_all'}, 'tts')
+
+def register_output_sinks(pipeline):
+    pipeline.add_sink(Sink('persist', persist_output, persist_interval))
+    pipeline.add_sink(Sink('leds', leds_output, leds_interval))
+    pipeline.add_sink(Sink('sound', sound_output, sound_interval))
+    pipeline.add_sink(Sink('tts', tts_output, window=tts_window))
+
+register_output_sinks(score_pipeline)
+
+# Score history of every game, recorded on each change
+score_history = ScoreHistory(lambda game_id: game_file(game_id, 'history.jsonl'))
+score_pipeline.add_listener(score_history.listener)
+
+# Settings read by OSC commands, cached briefly so bursts don't hit the file
+osc_settings_cache = {}
+osc_settings_ttl = 0.5
+
+def osc_settings(game_id):
+    cached = osc_settings_cache.get(game_id)
+    if cached is None or time.time() - cached[0] > osc_settings_ttl:
+        cached = osc_settings_cache[game_id] = (time.time(), read_settings(game_id))
+    return cached[1]
+
+def handle_osc_command(address, args):
+    # Commands, optionally prefixed with /game/<game_id> (team numbers start at 1):
+    #   /team/<n>/add <points>   /team/<n>/announce   /reset   /announce/all
+    parts = address.strip('/').split('/')
+    game_id = None
+    if len(parts) >= 2 and parts[0] == 'game':
+        if not game_exists(parts[1]):
+            return False
+        game_id = None if is_default_game(parts[1]) else parts[1]
+        parts = parts[2:]
+    settings = osc_settings(game_id)
+
+    if len(parts) == 3 and parts[0] == 'team':
+        team_index = int(parts[1]) - 1
+        if team_index < 0:
+            return False
+        if parts[2] == 'add':
+            points = int(args[0]) if args else 1
+            adjust_team_score(game_id, team_index, points, settings['sound_enabled'], settings['tts_enabled'])
+            return True
+        if parts[2] == 'announce':
+            if team_index >= len(score_pipeline.snapshot(game_id)[1]):
+                return False
+            if settings['tts_enabled']:
+                announce_game_team(game_id, team_index)
+            return True
+    elif parts == ['reset']:
+        reset_scores(game_id)
+        return True
+    elif parts == ['announce', 'all']:
+        if settings['tts_enabled']:
+            announce_game(game_id)
+        return True
+    return False
+
+def start_osc_listener():
+    # Off unless "osc_port" is set in config.json. It listens on "osc_host"
+    # (this machine only by default, "0.0.0.0" for the LAN) and "osc_allow"
+    # can list the sender addresses accepted, as OSC has no authentication.
+    config = read_config()
+    port = config.get('osc_port')
+    if not port:
+        return None
     try:
-        tts = gTTS(text=message, lang='en')
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-            temp_filename = fp.name
-            tts.save(temp_filename)
-        pygame.mixer.music.load(temp_filename)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        os.remove(temp_filename)
-    except Exception as e:
-        print(f"Error with TTS: {e}")
+        return OscListener(handle_osc_command, config.get('osc_host', '127.0.0.1'), port,
+                           config.get('osc_ack', False), config.get('osc_allow')).start()
+    except OSError as e:
+        print(f"Error starting OSC listener on port {port}: {e}")
+        return None
+
+# LAN replication, configured with "replication" in config.json:
+#   {"role": "master"}
+#   {"role": "follower", "master": "10.0.0.5", "transport": "multicast" or "tcp"}
+# plus optional "group", "port" and "snapshot_port". Followers refuse local
+# score changes and write what they receive through the pipeline, so their
+# renderers and LEDs work as on the master.
+replication_node = None
+
+def replication_snapshot(games=None):
+    # Current (version, teams) of the given games, or of every game
+    return {game: score_pipeline.snapshot(None if is_default_game(game) else game)
+            for game in (list_games() if games is None else games) if game_exists(game)}
+
+def apply_replicated_teams(game, version, teams):
+    game_id = None if is_default_game(game) else game
+    if not game_exists(game_id):
+        initialize_teams(game_id)
+    score_pipeline.replace(game_id, version, teams, {'type': 'replicated'})
+
+def start_replication():
+    global replication_node
+    options = read_config().get('replication') or {}
+    role = options.get('role')
+    ports = {key: options[key] for key in ('group', 'port', 'snapshot_port') if key in options}
+    try:
+        if role == 'master':
+            master = ReplicationMaster(replication_snapshot, multicast=options.get('transport') != 'tcp', **ports)
+            score_pipeline.add_listener(
+                lambda game_id, version, teams, event: master.listener(game_id or default_game_id, version, teams, event))
+            replication_node = master.start()
+        elif role == 'follower':
+            score_pipeline.read_only = f"This node follows the scores of {options['master']}"
+            replication_node = ReplicationFollower(apply_replicated_teams, options['master'],
+                                                   transport=options.get('transport', 'multicast'), **ports).start()
+    except (OSError, KeyError) as e:
+        print(f"Error starting replication as {role}: {e}")
+    return replication_node
 
 if __name__ == '__main__':
     multiprocessing.freeze_support()  # For Windows support
     initialize_teams()  # Ensure teams.json is initialized
 
+    # Mirror scores to or from other nodes, when configured
+    start_replication()
+
     # Start Flask app in a separate thread
     flask_thread = create_flask_thread()
 
-    # Start team windows in separate processes
-    team_processes = create_team_windows()
+    # Listen for OSC score commands from buzzers and consoles
+    osc_listener = start_osc_listener()
 
-    # Start pie chart window in a separate process
-    pie_chart_process = multiprocessing.Process(target=run_pie_chart_window)
-    pie_chart_process.start()
+    # Start team windows and pie chart window in supervised processes, which
+    # are restarted if they crash or stop responding (forked ones inherit the fonts)
+    preload_fonts()
+    window_supervisor.hooks.append(sync_team_windows)
+    open_game_windows(projector=False)
+    window_supervisor.start()
 
     # Run main Pygame app
     run_main_pygame()
 
-    # Terminate team windows when main window is closed
-    for p in team_processes:
-        p.terminate()
-    for p in team_processes:
-        p.join()
-
-    # Terminate pie chart window
-    pie_chart_process.terminate()
-    pie_chart_process.join()
-
-    # Quit Pygame mixer
+    # Close every window process, of any game, when main window is closed
+    window_supervisor.stop()
+
+    # Finish pending outputs, stop LED devices and quit Pygame mixer
+    if osc_listener is not None:
+        osc_listener.stop()
+    if replication_node is not None:
+        replication_node.stop()
+    score_pipeline.stop()
+    score_history.close()
+    output_hub.stop()
     pygame.mixer.quit()
@@ -0,0 +1,393 @@
+import argparse
+import bisect
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+
+import requests
+from flask import request, has_request_context
+
+from headless_app import prepare_workdir, remove_workdir, serve_app, quiet_access_log
+import hs
+
+# Measures how long a judge's click takes to reach each output.
+#
+# The harness runs the Flask app on a local port in a scratch directory,
+# clicks "+1" buttons from several client threads at a fixed rate, captures
+# the sACN packets the app sends with a local UDP receiver and runs a
+# renderer headless in a child process that reports when its frames change.
+# Every score version is then followed through the stages:
+#
+#   click sent -> request accepted -> output sinks (persist, leds, sound)
+#              -> renderer frame showing it -> DMX packet on the wire
+#
+# Usage: python latency_harness.py --clients 4 --rate 5 --duration 20
+#
+# sACN is always sent to port 5568, so the receiver binds a second loopback
+# address (127.0.0.2 by default, available on Linux) next to the sender.
+
+sacn_port = 5568
+click_header = 'X-Click-Id'
+
+# Clock shared with the renderer process (system-wide on Linux and Windows)
+clock = time.perf_counter
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+def summarize(seconds):
+    # Latency distribution in milliseconds
+    ms = [s * 1000 for s in seconds]
+    return {
+        'count': len(ms),
+        'p50': percentile(ms, 50),
+        'p90': percentile(ms, 90),
+        'p99': percentile(ms, 99),
+        'max': max(ms) if ms else None,
+    }
+
+
+class SacnCapture:
+    """Receives sACN packets and records (time, DMX bytes) for each one."""
+
+    def __init__(self, address):
+        self.packets = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((address, sacn_port))
+        self._sock.settimeout(0.2)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self._sock.recv(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            # E1.31 data packets carry the start code at offset 125 and a full
+            # 512 byte universe from 126
+            if len(data) > 126 and data[125] == 0:
+                self.packets.append((clock(), bytes(data[126:])))
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        self._sock.close()
+
+
+def run_headless_renderer(role, frames, stop_event):
+    # Child process: run a real renderer and report the total score shown
+    # whenever a flipped frame shows a new state
+    import pygame
+
+    seen = {'total': None, 'reported': None}
+    read_teams_if_changed = hs.read_teams_if_changed
+
+    def tracking_read_teams(game_id, stamp):
+        teams, stamp = read_teams_if_changed(game_id, stamp)
+        if teams is not None:
+            seen['total'] = sum(team['score'] for team in teams)
+        return teams, stamp
+
+    flip = pygame.display.flip
+
+    def tracking_flip():
+        flip()
+        if seen['total'] != seen['reported']:
+            seen['reported'] = seen['total']
+            frames.put((clock(), seen['total']))
+
+    def quit_when_stopped():
+        stop_event.wait()
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    hs.read_teams_if_changed = tracking_read_teams
+    pygame.display.flip = tracking_flip
+    threading.Thread(target=quit_when_stopped, daemon=True).start()
+
+    if role == 'overlay':
+        hs.run_pie_chart_window()
+    else:
+        hs.run_main_pygame()
+
+
+class LatencyHarness:
+    def __init__(self, args):
+        self.args = args
+        self.versions = {}  # version -> {'mutate', 'click', 'teams'}, plus 'total' and 'dmx' once analysed
+        self.clicks = {}  # click id -> {'send', 'response', 'status'}
+        self.dispatches = {}  # sink name -> [(start, end, version)]
+        self.frames = []  # (time, total score shown)
+        self._teams_versions = {}  # id(teams) -> version, for sink dispatches
+        self._lock = threading.Lock()
+        self._click_ids = iter(range(1, 1 << 62))
+
+    # Instrumentation
+
+    def on_version(self, game_id, version, teams, event):
+        # Runs inside the pipeline's lock, whose latency is being measured:
+        # only note the time and keep the teams, the rest is done in report()
+        mutate = clock()
+        click = request.headers.get(click_header) if has_request_context() else None
+        self.versions[version] = {'mutate': mutate, 'click': click, 'teams': teams}
+        self._teams_versions[id(teams)] = (version, teams)  # Keep teams alive so ids stay unique
+
+    def timed_handler(self, name, handler):
+        records = self.dispatches.setdefault(name, [])
+
+        def timed(game_id, teams, events):
+            start = clock()
+            try:
+                handler(game_id, teams, events)
+            finally:
+                version = self._teams_versions.get(id(teams), (None,))[0]
+                records.append((start, clock(), version))
+        return timed
+
+    # Setup
+
+    def start(self):
+        self.workdir = prepare_workdir('hs-latency-', self.args.teams,
+                                       {'sound_enabled': not self.args.no_sound, 'tts_enabled': False},
+                                       {'sacn_ip': self.args.sacn_address})
+        self.pixel_count = hs.config_pixel_count()
+
+        hs.score_pipeline.add_listener(self.on_version)
+        for sink in hs.score_pipeline.sinks:
+            sink.handler = self.timed_handler(sink.name, sink.handler)
+
+        self.capture = SacnCapture(self.args.sacn_address)
+
+        self.renderer = None
+        if self.args.renderer != 'none':
+            self.frame_queue = multiprocessing.Queue()
+            self.stop_event = multiprocessing.Event()
+            self.renderer = multiprocessing.Process(target=run_headless_renderer,
+                                                    args=(self.args.renderer, self.frame_queue, self.stop_event))
+            self.renderer.start()
+
+        self.server, self.base_url = serve_app()
+
+    def stop(self):
+        hs.score_pipeline.stop()
+        if self.renderer is not None:
+            self.stop_event.set()
+            deadline = time.time() + 5
+            while self.renderer.is_alive() and time.time() < deadline:
+                self.drain_frames()
+                time.sleep(0.05)
+            self.drain_frames()
+            if self.renderer.is_alive():
+                self.renderer.terminate()
+            self.renderer.join()
+        self.server.shutdown()
+        self.capture.stop()
+        hs.output_hub.stop()
+        remove_workdir(self.workdir)
+
+    def drain_frames(self):
+        while True:
+            try:
+                self.frames.append(self.frame_queue.get_nowait())
+            except Exception:
+                return
+
+    # Load
+
+    def click(self, session, team_index):
+        with self._lock:
+            click_id = next(self._click_ids)
+        record = self.clicks[click_id] = {'send': clock()}
+        response = session.post(self.base_url, data={'adjust': 'true', 'team_index': team_index, 'action': '1'},
+                                headers={click_header: str(click_id)},
+                                allow_redirects=self.args.follow_redirects)
+        record['response'] = clock()
+        record['status'] = response.status_code
+
+    def run_client(self, stop_at):
+        session = requests.Session()
+        interval = 1 / self.args.rate
+        next_click = clock() + random.random() * interval
+        while True:
+            now = clock()
+            if now >= stop_at:
+                return
+            if next_click > now:
+                time.sleep(next_click - now)
+            try:
+                self.click(session, random.randrange(self.args.teams))
+            except requests.RequestException as e:
+                print(f"Error sending click: {e}")
+            next_click += interval
+
+    def run(self):
+        self.start()
+        try:
+            # Warm up the sender, sounds and renderer before measuring
+            warmup = requests.Session()
+            self.click(warmup, 0)
+            time.sleep(self.args.warmup)
+            self.first_version = max(self.versions) + 1 if self.versions else 1
+
+            stop_at = clock() + self.args.duration
+            clients = [threading.Thread(target=self.run_client, args=(stop_at,))
+                       for _ in range(self.args.clients)]
+            for t in clients:
+                t.start()
+            while any(t.is_alive() for t in clients):
+                if self.renderer is not None:
+                    self.drain_frames()
+                time.sleep(0.05)
+
+            # Let the outputs catch up with the last clicks
+            time.sleep(self.args.settle)
+        finally:
+            self.stop()
+        return self.report()
+
+    # Analysis
+
+    def report(self):
+        stages = {}
+
+        # What each version shows, worked out now rather than in the pipeline's lock
+        for info in self.versions.values():
+            info['click'] = int(info['click']) if info['click'] else None
+            info['total'] = sum(team['score'] for team in info['teams'])
+            info['dmx'] = bytes(hs.build_dmx_data(info['teams'], self.pixel_count)[:512]).ljust(512, b'\0')
+
+        def add(stage, value):
+            stages.setdefault(stage, []).append(value)
+
+        measured = sorted(v for v in self.versions if v >= self.first_version)
+
+        for version in measured:
+            info = self.versions[version]
+            click = self.clicks.get(info['click'])
+            if click is None:
+                continue
+            if 'response' in click:
+                add('request', click['response'] - click['send'])
+            add('accept', info['mutate'] - click['send'])
+
+        # Sinks: first dispatch that carried this version or a newer one
+        for name, records in self.dispatches.items():
+            use_start = name in ('sound', 'tts')  # Audio counts from when playback starts
+            records = sorted(r for r in records if r[2] is not None)
+            j = 0
+            for version in measured:
+                while j < len(records) and records[j][2] < version:
+                    j += 1
+                if j == len(records):
+                    break
+                done = records[j][0] if use_start else records[j][1]
+                add(f"sink:{name}", done - self.versions[version]['mutate'])
+
+        # Renderer frames, matched to versions through the total score
+        frames = sorted(self.frames)
+        version_by_total = {info['total']: v for v, info in self.versions.items()}
+        frame_versions = [(t, version_by_total.get(total)) for t, total in frames]
+        i = 0
+        for version in measured:
+            info = self.versions[version]
+            while i < len(frame_versions) and (frame_versions[i][1] is None or frame_versions[i][1] < version):
+                i += 1
+            if i == len(frame_versions):
+                break
+            add('renderer', frame_versions[i][0] - info['mutate'])
+            click = self.clicks.get(info['click'])
+            if click is not None:
+                add('end_to_end:pixels', frame_versions[i][0] - click['send'])
+
+        # DMX packets, matched to the newest version that produces the same data
+        versions_by_dmx = {}
+        for v in sorted(self.versions):
+            versions_by_dmx.setdefault(self.versions[v]['dmx'], []).append(v)
+        mutate_times = [self.versions[v]['mutate'] for v in sorted(self.versions)]
+        ordered_versions = sorted(self.versions)
+        packets = []
+        for t, dmx in sorted(self.capture.packets):
+            newest = bisect.bisect_right(mutate_times, t)
+            if newest == 0:
+                continue  # Sent before any version was made
+            candidates = [v for v in versions_by_dmx.get(dmx, []) if v <= ordered_versions[newest - 1]]
+            if candidates:
+                packets.append((t, candidates[-1]))
+        packet_times = [t for t, _ in packets]
+        for version in measured:
+            info = self.versions[version]
+            previous = self.versions.get(version - 1)
+            if previous is not None and previous['dmx'] == info['dmx']:
+                continue  # No visible change, nothing new to send
+            j = bisect.bisect_left(packet_times, info['mutate'])
+            while j < len(packets) and packets[j][1] < version:
+                j += 1
+            if j == len(packets):
+                continue
+            add('dmx', packets[j][0] - info['mutate'])
+            click = self.clicks.get(info['click'])
+            if click is not None:
+                add('end_to_end:dmx', packets[j][0] - click['send'])
+
+        errors = sum(1 for c in self.clicks.values() if c.get('status', 500) >= 400)
+        return {
+            'config': {k: v for k, v in vars(self.args).items() if k != 'json'},
+            'clicks': len(self.clicks),
+            'errors': errors,
+            'versions': len(measured),
+            'packets': len(self.capture.packets),
+            'frames': len(frames),
+            'dispatches': {name: len(records) for name, records in self.dispatches.items()},
+            'stages_ms': {stage: summarize(values) for stage, values in sorted(stages.items())},
+        }
+
+
+def print_report(report):
+    print(f"Clicks: {report['clicks']} ({report['errors']} errors), versions measured: {report['versions']}, "
+          f"sACN packets: {report['packets']}, renderer frames: {report['frames']}")
+    print(f"Sink dispatches: {report['dispatches']}")
+    print(f"{'stage':<20}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}   (ms)")
+    for stage, s in report['stages_ms'].items():
+        cells = ''.join(f"{s[k]:9.1f}" if s[k] is not None else f"{'-':>9}" for k in ('p50', 'p90', 'p99', 'max'))
+        print(f"{stage:<20}{s['count']:>7}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure click-to-output latency of the scoreboard.')
+    parser.add_argument('--clients', type=int, default=2, help='concurrent clicking clients')
+    parser.add_argument('--rate', type=float, default=5, help='clicks per second per client')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load')
+    parser.add_argument('--teams', type=int, default=4, help='number of teams')
+    parser.add_argument('--renderer', choices=['projector', 'overlay', 'none'], default='projector')
+    parser.add_argument('--sacn-address', default='127.0.0.2', help='local address to capture sACN on')
+    parser.add_argument('--no-sound', action='store_true', help='disable sound effects')
+    parser.add_argument('--follow-redirects', action='store_true', help='also load the page after each click')
+    parser.add_argument('--warmup', type=float, default=1.0, help='seconds to wait after the warm-up click')
+    parser.add_argument('--settle', type=float, default=1.0, help='seconds to wait for outputs after the load')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    quiet_access_log()
+
+    report = LatencyHarness(args).run()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
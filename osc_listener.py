@@ -0,0 +1,239 @@
+import socket
+import struct
+import threading
+
+# Minimal OSC over UDP, for buzzers and lighting consoles that send score
+# commands without going through the web UI.
+#
+# A datagram may hold a single OSC message, an OSC bundle of messages, or
+# plain text commands (one per line or separated by ';'), which is handy for
+# testing with netcat:
+#
+#   echo "/team/2/add 3; /announce/all" | nc -u -w0 127.0.0.1 9000
+
+default_osc_port = 9000
+
+
+def _pad(length):
+    # OSC strings and blobs are padded to a multiple of four bytes
+    return (length + 4) & ~3
+
+def _read_string(data, offset):
+    end = data.index(b'\0', offset)
+    return data[offset:end].decode('utf-8'), offset + _pad(end - offset)
+
+def parse_osc_message(data):
+    address, offset = _read_string(data, 0)
+    if offset >= len(data):
+        return address, []  # No type tags, no arguments
+    tags, offset = _read_string(data, offset)
+
+    args = []
+    for tag in tags[1:]:
+        if tag == 'i':
+            args.append(struct.unpack_from('>i', data, offset)[0])
+            offset += 4
+        elif tag == 'f':
+            args.append(struct.unpack_from('>f', data, offset)[0])
+            offset += 4
+        elif tag == 'h':
+            args.append(struct.unpack_from('>q', data, offset)[0])
+            offset += 8
+        elif tag == 'd':
+            args.append(struct.unpack_from('>d', data, offset)[0])
+            offset += 8
+        elif tag == 's':
+            value, offset = _read_string(data, offset)
+            args.append(value)
+        elif tag == 'b':
+            size = struct.unpack_from('>i', data, offset)[0]
+            args.append(data[offset + 4:offset + 4 + size])
+            offset += 4 + ((size + 3) & ~3)
+        elif tag == 'T':
+            args.append(True)
+        elif tag == 'F':
+            args.append(False)
+        elif tag == 'N':
+            args.append(None)
+        else:
+            raise ValueError(f"Unsupported OSC type tag '{tag}'")
+    return address, args
+
+def parse_osc_bundle(data, messages):
+    # '#bundle\0', 8 byte time tag, then size-prefixed elements
+    offset = 16
+    while offset + 4 <= len(data):
+        size = struct.unpack_from('>i', data, offset)[0]
+        element = data[offset + 4:offset + 4 + size]
+        offset += 4 + size
+        if element.startswith(b'#bundle\0'):
+            parse_osc_bundle(element, messages)
+        else:
+            messages.append(parse_osc_message(element))
+    return messages
+
+def _parse_text_arg(value):
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_text_commands(text):
+    messages = []
+    for line in text.replace(';', '\n').splitlines():
+        parts = line.split()
+        if parts:
+            messages.append((parts[0], [_parse_text_arg(part) for part in parts[1:]]))
+    return messages
+
+def parse_packet(data):
+    """Returns (messages, is_text) where messages is a list of (address, args)."""
+    if data.startswith(b'#bundle\0'):
+        return parse_osc_bundle(data, []), False
+    if b'\0' not in data:
+        return parse_text_commands(data.decode('utf-8')), True
+    return [parse_osc_message(data)], False
+
+def encode_osc_message(address, *args):
+    def string(value):
+        raw = value.encode('utf-8')
+        return raw + b'\0' * (_pad(len(raw)) - len(raw))
+
+    tags = ','
+    payload = b''
+    for arg in args:
+        if isinstance(arg, bool):
+            tags += 'T' if arg else 'F'
+        elif isinstance(arg, int):
+            tags += 'i'
+            payload += struct.pack('>i', arg)
+        elif isinstance(arg, float):
+            tags += 'f'
+            payload += struct.pack('>f', arg)
+        else:
+            tags += 's'
+            payload += string(str(arg))
+    return string(address) + string(tags) + payload
+
+def encode_osc_bundle(messages):
+    # messages: list of already encoded OSC messages, time tag 1 means "now"
+    data = b'#bundle\0' + struct.pack('>Q', 1)
+    for message in messages:
+        data += struct.pack('>i', len(message)) + message
+    return data
+
+
+class OscListener:
+    """
+    Receives OSC/text datagrams on a UDP port and passes each message to
+    handler(address, args), which returns True when the command was applied.
+
+    With ack enabled, every datagram is answered with '/ack <applied> <failed>'
+    in the same format (OSC or text) it was sent in. OSC has no
+    authentication, so by default only this host can send commands; allow,
+    when given, lists the sender IP addresses accepted, others are dropped.
+    """
+
+    def __init__(self, handler, host='127.0.0.1', port=default_osc_port, ack=False, allow=None):
+        self.handler = handler
+        self.ack = ack
+        self.allow = set(allow) if allow is not None else None
+        self.received = 0  # Messages received
+        self.applied = 0  # Messages the handler applied
+        self.failed = 0  # Messages rejected or that failed
+        self.refused = 0  # Datagrams from senders not allowed
+
+        # No SO_REUSEADDR: a second listener on the port must fail to bind
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)  # Absorb bursts
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.5)
+        self.address = self._sock.getsockname()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='osc-listener', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sock.close()
+
+    def handle_datagram(self, data):
+        try:
+            messages, is_text = parse_packet(data)
+        except Exception as e:
+            print(f"Error parsing OSC packet: {e}")
+            self.failed += 1
+            return 0, 1, False
+
+        applied = failed = 0
+        for address, args in messages:
+            try:
+                ok = self.handler(address, args)
+            except Exception as e:
+                print(f"Error handling OSC command {address}: {e}")
+                ok = False
+            if ok:
+                applied += 1
+            else:
+                failed += 1
+        self.received += len(messages)
+        self.applied += applied
+        self.failed += failed
+        return applied, failed, is_text
+
+    def _run(self):
+        while self._running:
+            try:
+                data, sender = self._sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if self.allow is not None and sender[0] not in self.allow:
+                self.refused += 1
+                continue
+
+            applied, failed, is_text = self.handle_datagram(data)
+
+            if self.ack:
+                if is_text:
+                    reply = f"/ack {applied} {failed}\n".encode('utf-8')
+                else:
+                    reply = encode_osc_message('/ack', applied, failed)
+                try:
+                    self._sock.sendto(reply, sender)
+                except OSError as e:
+                    print(f"Error sending OSC ack: {e}")
+
+
+def send_osc(host, port, messages, timeout=None):
+    """
+    Send (address, *args) tuples as one bundle; handy for testing a listener.
+    With a timeout, waits for the ack and returns it as (address, args).
+    """
+    encoded = [encode_osc_message(address, *args) for address, *args in messages]
+    data = encoded[0] if len(encoded) == 1 else encode_osc_bundle(encoded)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(data, (host, port))
+        if timeout is None:
+            return None
+        sock.settimeout(timeout)
+        reply, _ = sock.recvfrom(65535)
+        return parse_osc_message(reply)
+
+
+if __name__ == '__main__':
+    # Send commands from the command line: python osc_listener.py /team/1/add 2
+    import sys
+    address, *args = sys.argv[1:]
+    print(send_osc('127.0.0.1', default_osc_port, [(address, *[_parse_text_arg(a) for a in args])], timeout=2))
@@ -0,0 +1,274 @@
+import threading
+import time
+
+from sacn import sACNsender
+from wled_control import WledClient
+
+# Fans LED frames out to any number of sACN destinations and WLED devices.
+#
+# Every device has its own worker thread and a small mailbox of pending
+# frames, so publishing never blocks and a slow or dead device only delays
+# itself. Frames that arrive while a device is busy or backing off replace
+# the older pending ones (only the newest state matters for LEDs), and failed
+# sends are retried with exponential backoff.
+
+sacn_universe_channels = 510  # 170 RGB pixels per 512 channel universe
+
+
+class OutputDevice:
+    """
+    Base class for one output device.
+
+    Subclasses implement send(frame) and may implement open()/close().
+    build(teams) turns the teams into this device's frame and runs on the
+    device's thread, so the publisher never pays for it.
+    """
+
+    def __init__(self, name, build, max_pending=1, retry_min=0.5, retry_max=30.0):
+        self.name = name
+        self.build = build
+        self.game_id = None  # Set by the hub
+        self.max_pending = max_pending  # Older frames beyond this are dropped
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_send_time = None  # Seconds the last successful send took
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._opened = False
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+    # Implemented by subclasses
+
+    def open(self):
+        pass
+
+    def send(self, frame):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # Worker
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"output-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, teams):
+        with self._condition:
+            self._pending.append(teams)
+            if len(self._pending) > self.max_pending:
+                self.dropped += len(self._pending) - self.max_pending
+                del self._pending[:-self.max_pending]
+            self._condition.notify_all()
+
+    @property
+    def healthy(self):
+        return self._backoff == 0.0
+
+    def status(self):
+        return {
+            'name': self.name,
+            'state': 'ok' if self.healthy else 'retrying',
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'pending': len(self._pending),
+            'last_error': self.last_error,
+            'last_send_ms': None if self.last_send_time is None else round(self.last_send_time * 1000, 1),
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # Wait for a frame, and for the backoff to pass after a failure
+                while self._running and (not self._pending or time.time() < self._next_attempt):
+                    timeout = None if not self._pending else self._next_attempt - time.time()
+                    self._condition.wait(timeout)
+                if not self._running:
+                    break
+                teams = self._pending.pop(0)
+
+            start = time.time()
+            try:
+                if not self._opened:
+                    self.open()
+                    self._opened = True
+                self.send(self.build(teams))
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+                self._opened = False  # Reconnect on the next attempt
+                self._backoff = min(max(self._backoff * 2, self.retry_min), self.retry_max)
+                self._next_attempt = time.time() + self._backoff
+                with self._condition:
+                    # Retry with the newest frame rather than this one
+                    if not self._pending:
+                        self._pending.append(teams)
+                continue
+
+            self.sent += 1
+            self.last_send_time = time.time() - start
+            self._backoff = 0.0
+            self._next_attempt = 0.0
+
+        try:
+            self.close()
+        except Exception as e:
+            print(f"Error closing output {self.name}: {e}")
+
+
+class SacnDevice(OutputDevice):
+    """
+    A unicast sACN destination. Senders are shared per destination through the hub.
+
+    A frame longer than one universe is split over consecutive universes
+    starting at universe, 170 RGB pixels (510 channels) each, so no pixel
+    straddles two universes.
+    """
+
+    def __init__(self, name, build, hub, destination, universe=1, **options):
+        super().__init__(name, build, **options)
+        self.hub = hub
+        self.destination = destination
+        self.universe = universe
+        self.outputs = []
+
+    def open(self):
+        self.outputs = [self.hub.sacn_output(self.destination, self.universe, self)]
+
+    def send(self, frame):
+        chunks = [frame[i:i + sacn_universe_channels] for i in range(0, len(frame), sacn_universe_channels)] or [[]]
+        while len(self.outputs) < len(chunks):
+            self.outputs.append(self.hub.sacn_output(self.destination, self.universe + len(self.outputs), self))
+        for output, chunk in zip(self.outputs, chunks):
+            output.dmx_data = chunk
+
+    def close(self):
+        self.hub.release(self)
+
+
+class WledDevice(OutputDevice):
+    """A WLED controller; each team's fill percentage goes to its own segment."""
+
+    def __init__(self, name, build, host, timeout=1.0, **options):
+        super().__init__(name, build, **options)
+        self.client = WledClient(host, timeout)
+
+    def open(self):
+        self.client.init()
+
+    def send(self, frame):
+        # frame: list of fill percentages, team i drives segment i + 1
+        segments = len(self.client.segments_info)
+        self.client.set_percentages({i + 1: percentage for i, percentage in enumerate(frame) if i < segments})
+
+    def close(self):
+        self.client.close()
+
+
+class OutputHub:
+    """
+    Devices of every game, plus the sACN senders they share.
+
+    configure(game_id, devices) replaces a game's devices when their specs
+    change; publish(game_id, teams) hands the teams to every device of the
+    game without waiting for any of them.
+
+    Each sACN universe of a destination belongs to one game at a time: a
+    device of another game that asks for it fails with an error (shown in
+    its status) and retries until the universe is released.
+    """
+
+    def __init__(self):
+        self._games = {}  # game_id -> (specs, devices)
+        self._senders = {}  # destination -> sACNsender
+        self._claims = {}  # (destination, universe) -> device sending to it
+        self._lock = threading.Lock()
+
+    def sacn_output(self, destination, universe=1, device=None):
+        with self._lock:
+            owner = self._claims.get((destination, universe))
+            if owner is not None and device is not None and owner.game_id != device.game_id:
+                game = f"game '{owner.game_id}'" if owner.game_id else "the default game"
+                raise ValueError(f"sACN universe {universe} of {destination} is already used by {game}")
+            if device is not None:
+                self._claims[(destination, universe)] = device
+            sender = self._senders.get(destination)
+            if sender is None:
+                sender = self._senders[destination] = sACNsender()
+                sender.start()
+            if universe not in sender.get_active_outputs():
+                sender.activate_output(universe)
+                sender[universe].multicast = False  # Set to unicast mode
+                sender[universe].destination = destination
+            return sender[universe]
+
+    def release(self, device):
+        # Stop sending the universes a device claimed, unless another device took them over
+        with self._lock:
+            for key, owner in list(self._claims.items()):
+                if owner is device:
+                    del self._claims[key]
+                    destination, universe = key
+                    sender = self._senders.get(destination)
+                    if sender is not None and universe in sender.get_active_outputs():
+                        sender.deactivate_output(universe)
+
+    def configure(self, game_id, specs, make_devices):
+        # specs identify the wanted devices; make_devices() is only called when they change
+        with self._lock:
+            current = self._games.get(game_id)
+            if current is not None and current[0] == specs:
+                return current[1]
+            old_devices = current[1] if current is not None else []
+            devices = make_devices()
+            for device in devices:
+                device.game_id = game_id
+                device.start()
+            self._games[game_id] = (specs, devices)
+        for device in old_devices:
+            device.stop()
+        return devices
+
+    def publish(self, game_id, teams):
+        current = self._games.get(game_id)
+        if current is not None:
+            for device in current[1]:
+                device.submit(teams)
+
+    def status(self):
+        return {game_id: [device.status() for device in devices]
+                for game_id, (_, devices) in list(self._games.items())}
+
+    def stop(self):
+        with self._lock:
+            games = list(self._games.values())
+            self._games.clear()
+        for _, devices in games:
+            for device in devices:
+                device.stop()
+        with self._lock:
+            # The sender threads are not daemons, stop them before the process exits
+            for sender in self._senders.values():
+                sender.stop()
+            self._senders.clear()
@@ -0,0 +1,336 @@
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+# Mirrors the scores of a master node to follower nodes on the LAN.
+#
+# The master numbers every state of every game (the score pipeline version)
+# and sends each change as a small delta, either once to a UDP multicast
+# group, whatever the number of followers, or down a TCP stream per
+# follower. Followers apply a delta only when it follows the version they
+# hold; on join, after a gap or when the master restarts they fetch a
+# snapshot over TCP instead. A heartbeat with the latest version of every
+# game lets idle followers notice lost packets.
+#
+# Messages are JSON, one per datagram or line:
+#   delta      {"e": epoch, "g": game, "v": version, "b": base, "t": time, "s": {index: score}}
+#   full state {"e": epoch, "g": game, "v": version, "t": time, "teams": [...]}
+#   heartbeat  {"e": epoch, "hb": {game: version}, "t": time}
+#   snapshot   {"e": epoch, "games": {game: {"v": version, "teams": [...]}}}
+
+default_group = '239.255.42.99'
+default_port = 5600  # Multicast deltas
+default_snapshot_port = 5601  # TCP snapshots and streams
+heartbeat_interval = 1.0
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+def team_structure(teams):
+    return [(team.get('id'), team['name'], team['color']) for team in teams]
+
+
+class ReplicationMaster:
+    """
+    Publishes every version of every game.
+
+    snapshot(games) returns {game: (version, teams)} for the given game ids,
+    or for every game when games is None.
+    """
+
+    def __init__(self, snapshot, group=default_group, port=default_port,
+                 snapshot_port=default_snapshot_port, bind='0.0.0.0', ttl=1, multicast=True):
+        self.snapshot = snapshot
+        self.group = group
+        self.port = port
+        self.epoch = random.getrandbits(31)  # Changes on every restart
+        self.sent_bytes = 0
+        self.sent_messages = 0
+
+        self._last = {}  # game -> (version, teams)
+        self._subscribers = []  # Per TCP follower: [connection, condition, queue]
+        self._lock = threading.Lock()
+        self._running = True
+
+        self._udp = None
+        if multicast:
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+            self._udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)  # Followers on this host
+
+        master = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                master._handle_connection(self)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((bind, snapshot_port), Handler)
+        self._server.daemon_threads = True
+        self.snapshot_address = self._server.server_address
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='replication-server', daemon=True).start()
+        threading.Thread(target=self._heartbeat, name='replication-heartbeat', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            for subscriber in self._subscribers:
+                with subscriber[1]:
+                    subscriber[1].notify_all()
+        if self._udp is not None:
+            self._udp.close()
+
+    def listener(self, game, version, teams, event):
+        # Called for every version, in order; teams must not be modified
+        with self._lock:
+            last = self._last.get(game)
+            message = {'e': self.epoch, 'g': game, 'v': version, 't': time.time()}
+            if last is not None and team_structure(last[1]) == team_structure(teams):
+                message['b'] = last[0]
+                message['s'] = {str(i): team['score'] for i, team in enumerate(teams)
+                                if team['score'] != last[1][i]['score']}
+            else:
+                message['teams'] = teams
+            self._last[game] = (version, teams)
+            self._publish(encode(message))
+
+    def _publish(self, data):
+        if self._udp is not None:
+            try:
+                self._udp.sendto(data, (self.group, self.port))
+                self.sent_bytes += len(data)
+                self.sent_messages += 1
+            except OSError as e:
+                print(f"Error sending replication packet: {e}")
+        for connection, condition, queue in self._subscribers:
+            with condition:
+                queue.append(data)
+                condition.notify()
+
+    def _heartbeat(self):
+        while self._running:
+            time.sleep(heartbeat_interval)
+            with self._lock:
+                versions = {game: last[0] for game, last in self._last.items()}
+                self._publish(encode({'e': self.epoch, 'hb': versions, 't': time.time()}))
+
+    def snapshot_message(self, games=None):
+        return {'e': self.epoch,
+                'games': {game: {'v': version, 'teams': teams}
+                          for game, (version, teams) in self.snapshot(games).items()}}
+
+    def _handle_connection(self, handler):
+        # Requests are one JSON line: {"snapshot": [games] or null} or {"subscribe": true}
+        try:
+            request = json.loads(handler.rfile.readline() or b'{}')
+        except ValueError:
+            return
+        if 'snapshot' in request:
+            data = encode(self.snapshot_message(request['snapshot'])) + b'\n'
+            handler.wfile.write(data)
+            self.sent_bytes += len(data)
+            return
+        if not request.get('subscribe'):
+            return
+
+        # Stream: snapshot first, then every message as a line. Each follower
+        # has its own queue, so a slow one only falls behind itself.
+        # Messages queued before the snapshot is taken are older than it and
+        # skipped by the follower. The snapshot is taken outside our lock, as
+        # listener() runs under the pipeline's lock and takes ours.
+        subscriber = [handler.connection, threading.Condition(), []]
+        with self._lock:
+            self._subscribers.append(subscriber)
+        try:
+            handler.wfile.write(encode(self.snapshot_message()) + b'\n')
+            while self._running:
+                with subscriber[1]:
+                    while self._running and not subscriber[2]:
+                        subscriber[1].wait()
+                    pending, subscriber[2] = subscriber[2], []
+                data = b''.join(message + b'\n' for message in pending)
+                handler.wfile.write(data)
+                self.sent_bytes += len(data)
+        except OSError:
+            pass  # Follower went away
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+    def status(self):
+        return {'role': 'master', 'epoch': self.epoch, 'games': {game: last[0] for game, last in self._last.items()},
+                'sent_messages': self.sent_messages, 'sent_bytes': self.sent_bytes,
+                'tcp_followers': len(self._subscribers)}
+
+
+class ReplicationFollower:
+    """
+    Keeps a local copy of the master's games.
+
+    apply(game, version, teams) is called with every new state, in version
+    order per game, from the follower's receive thread.
+    """
+
+    def __init__(self, apply, master_host, group=default_group, port=default_port,
+                 snapshot_port=default_snapshot_port, transport='multicast', interface='0.0.0.0'):
+        self.apply = apply
+        self.master = (master_host, snapshot_port)
+        self.group = group
+        self.port = port
+        self.transport = transport
+        self.interface = interface
+
+        self.epoch = None
+        self.versions = {}  # game -> version
+        self.teams = {}  # game -> teams
+        self.received = 0
+        self.received_bytes = 0
+        self.snapshots = 0
+        self.gaps = 0
+        self.last_lag = None  # Seconds from master send to local apply
+
+        self._lock = threading.Lock()
+        self._snapshot_wanted = threading.Event()
+        self._running = False
+        self._sock = None
+
+    def start(self):
+        self._running = True
+        if self.transport == 'tcp':
+            threading.Thread(target=self._run_tcp, name='replication-stream', daemon=True).start()
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)  # Several followers per host
+            self._sock.bind(('', self.port))
+            membership = struct.pack('4s4s', socket.inet_aton(self.group), socket.inet_aton(self.interface))
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            self._sock.settimeout(0.5)
+            threading.Thread(target=self._run_multicast, name='replication-receive', daemon=True).start()
+            threading.Thread(target=self._run_snapshots, name='replication-snapshot', daemon=True).start()
+            self._snapshot_wanted.set()  # Catch up on join
+        return self
+
+    def stop(self):
+        self._running = False
+        self._snapshot_wanted.set()
+        if self._sock is not None:
+            self._sock.close()
+
+    # Applying state
+
+    def handle(self, message):
+        with self._lock:
+            if 'games' in message:
+                self._apply_snapshot(message)
+                return
+            if message.get('e') != self.epoch:
+                self._snapshot_wanted.set()  # Joined late or the master restarted
+                return
+            if 'hb' in message:
+                if any(self.versions.get(game, -1) < version for game, version in message['hb'].items()):
+                    self.gaps += 1
+                    self._snapshot_wanted.set()
+                return
+
+            game = message['g']
+            local = self.versions.get(game)
+            if local is not None and message['v'] <= local:
+                return  # Already have it
+            if 'teams' in message:
+                teams = message['teams']
+            elif local is not None and message['b'] == local:
+                teams = [dict(team) for team in self.teams[game]]
+                for index, score in message['s'].items():
+                    teams[int(index)]['score'] = score
+            else:
+                self.gaps += 1
+                self._snapshot_wanted.set()
+                return
+            self._set(game, message['v'], teams)
+            self.last_lag = time.time() - message['t']
+
+    def _apply_snapshot(self, message):
+        if message['e'] != self.epoch:
+            self.epoch = message['e']
+            self.versions = {}  # Versions of another master run can't be compared
+        self.snapshots += 1
+        for game, state in message['games'].items():
+            if state['v'] > self.versions.get(game, -1):  # Deltas may have overtaken it
+                self._set(game, state['v'], state['teams'])
+
+    def _set(self, game, version, teams):
+        self.versions[game] = version
+        self.teams[game] = teams
+        try:
+            self.apply(game, version, teams)
+        except Exception as e:
+            print(f"Error applying replicated scores: {e}")
+
+    # Transports
+
+    def _run_multicast(self):
+        while self._running:
+            try:
+                data = self._sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.received += 1
+            self.received_bytes += len(data)
+            try:
+                self.handle(json.loads(data))
+            except ValueError as e:
+                print(f"Error reading replication packet: {e}")
+
+    def _run_snapshots(self):
+        while self._running:
+            self._snapshot_wanted.wait()
+            if not self._running:
+                return
+            self._snapshot_wanted.clear()
+            try:
+                with socket.create_connection(self.master, timeout=2) as sock:
+                    sock.sendall(encode({'snapshot': None}) + b'\n')
+                    data = sock.makefile('rb').readline()
+                self.received_bytes += len(data)
+                self.handle(json.loads(data))
+            except (OSError, ValueError) as e:
+                print(f"Error fetching replication snapshot: {e}")
+                time.sleep(1)
+                self._snapshot_wanted.set()
+            time.sleep(0.2)  # Don't hammer the master while catching up
+
+    def _run_tcp(self):
+        while self._running:
+            try:
+                with socket.create_connection(self.master, timeout=2) as sock:
+                    sock.settimeout(heartbeat_interval * 5)  # Heartbeats keep the stream alive
+                    sock.sendall(encode({'subscribe': True}) + b'\n')
+                    for line in sock.makefile('rb'):
+                        if not self._running:
+                            return
+                        self.received += 1
+                        self.received_bytes += len(line)
+                        self.handle(json.loads(line))
+            except (OSError, ValueError) as e:
+                print(f"Replication stream lost: {e}")
+            time.sleep(1)  # Reconnect
+
+    def status(self):
+        return {'role': 'follower', 'transport': self.transport, 'master': self.master[0], 'epoch': self.epoch,
+                'games': dict(self.versions), 'received': self.received, 'received_bytes': self.received_bytes,
+                'snapshots': self.snapshots, 'gaps': self.gaps,
+                'last_lag_ms': None if self.last_lag is None else round(self.last_lag * 1000, 2)}
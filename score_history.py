@@ -0,0 +1,213 @@
+import bisect
+import heapq
+import json
+import threading
+import time
+
+# Timestamped score samples per game, with statistics kept up to date as
+# samples arrive so the stats never need a rescan of the history.
+
+# Number of largest swings kept per game
+max_swings = 10
+
+
+def team_key(index, team):
+    # Teams are followed by id, so renames and duplicate names don't mix up
+    # their samples; samples saved before teams had ids use their position
+    return team.get('id', str(index + 1))
+
+
+class GameHistory:
+    """
+    Score samples and running statistics for one game.
+
+    Samples are stored in parallel lists (times, scores) in time order; each
+    score entry maps team id to score at that time. names holds the latest
+    name of every team id, used as its label.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.scores = []
+        self.names = {}  # id -> latest name
+        self.teams = {}  # id -> running statistics of that team
+        self.lead_changes = 0
+        self.leader = None
+        self.swings = []  # Min-heap of (abs change, time, id, change)
+
+    def record(self, timestamp, teams):
+        for i, team in enumerate(teams):
+            self.names[team_key(i, team)] = team['name']
+        scores = {team_key(i, team): max(0, team['score']) for i, team in enumerate(teams)}
+        previous = self.scores[-1] if self.scores else {}
+        if scores == previous:
+            return False  # Only names/colours changed, nothing to chart
+        if self.times and timestamp < self.times[-1]:
+            timestamp = self.times[-1]  # Keep times sorted for bisect
+
+        self.times.append(timestamp)
+        self.scores.append(scores)
+
+        # Per-team totals and largest swings
+        for key, score in scores.items():
+            stats = self.teams.get(key)
+            if stats is None:
+                stats = self.teams[key] = {'gained': 0, 'lost': 0, 'events': 0,
+                                            'biggest_gain': 0, 'biggest_loss': 0,
+                                            'first_time': timestamp}
+            if not previous:
+                continue  # The first sample is the baseline
+            change = score - previous.get(key, 0)
+            if change == 0:
+                continue
+            stats['events'] += 1
+            stats['last_time'] = timestamp
+            if change > 0:
+                stats['gained'] += change
+                stats['biggest_gain'] = max(stats['biggest_gain'], change)
+            else:
+                stats['lost'] -= change
+                stats['biggest_loss'] = max(stats['biggest_loss'], -change)
+
+            swing = (abs(change), timestamp, key, change)
+            if len(self.swings) < max_swings:
+                heapq.heappush(self.swings, swing)
+            elif swing > self.swings[0]:
+                heapq.heapreplace(self.swings, swing)
+
+        # Lead changes, ties keep the previous leader
+        if scores:
+            top = max(scores.values())
+            leaders = [key for key, score in scores.items() if score == top]
+            if len(leaders) == 1 and top > 0 and leaders[0] != self.leader:
+                if self.leader is not None:
+                    self.lead_changes += 1
+                self.leader = leaders[0]
+        return True
+
+    def window(self, start=None, end=None):
+        # Index range of the samples inside [start, end]
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_right(self.times, end)
+        return lo, hi
+
+    def series(self, start=None, end=None, points=200):
+        """
+        Downsampled scores over a time window.
+
+        Picks at most `points` evenly spaced samples (always including the
+        last one) so the cost depends on `points`, not on the history length.
+        """
+        lo, hi = self.window(start, end)
+        count = hi - lo
+        if count <= 0:
+            return {'times': [], 'teams': {}}
+        if count <= points:
+            indices = range(lo, hi)
+        else:
+            step = count / points
+            indices = [lo + int(i * step) for i in range(points - 1)] + [hi - 1]
+
+        present = set().union(*[self.scores[i] for i in indices])
+        keys = [key for key in self.teams if key in present]  # In order of first appearance
+        return {
+            'times': [self.times[i] for i in indices],
+            'teams': {key: {'name': self.names[key], 'scores': [self.scores[i].get(key) for i in indices]}
+                      for key in keys},
+        }
+
+    def window_rates(self, start=None, end=None):
+        # Net points per minute of each team between the first and last sample of the window
+        lo, hi = self.window(start, end)
+        if hi - lo < 2:
+            return {}
+        minutes = (self.times[hi - 1] - self.times[lo]) / 60 or 1
+        first, last = self.scores[lo], self.scores[hi - 1]
+        return {key: (score - first.get(key, 0)) / minutes for key, score in last.items()}
+
+    def stats(self):
+        teams = {}
+        now = self.times[-1] if self.times else 0
+        current = self.scores[-1] if self.scores else {}
+        for key, stats in self.teams.items():
+            minutes = (now - stats['first_time']) / 60
+            teams[key] = dict(stats, name=self.names[key], score=current.get(key),
+                              rate_per_minute=stats['gained'] / minutes if minutes > 0 else 0)
+        return {
+            'samples': len(self.times),
+            'leader': self.leader,
+            'leader_name': self.names.get(self.leader),
+            'lead_changes': self.lead_changes,
+            'largest_swings': [{'time': t, 'team': key, 'name': self.names[key], 'change': change}
+                               for _, t, key, change in sorted(self.swings, reverse=True)],
+            'teams': teams,
+        }
+
+
+class ScoreHistory:
+    """
+    History of every game, fed by the score pipeline.
+
+    When path_for(game_id) is given, samples are appended to that file as
+    JSON lines and replayed the first time the game's history is used.
+    """
+
+    def __init__(self, path_for=None):
+        self._path_for = path_for
+        self._games = {}
+        self._files = {}  # game_id -> history file kept open for appending
+        self._lock = threading.Lock()
+
+    def _game(self, game_id):
+        history = self._games.get(game_id)
+        if history is None:
+            history = self._games[game_id] = GameHistory()
+            if self._path_for is not None:
+                try:
+                    with open(self._path_for(game_id)) as f:
+                        for line in f:
+                            sample = json.loads(line)
+                            history.record(sample['time'], sample['teams'])
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    print(f"Error loading score history: {e}")
+        return history
+
+    def record(self, game_id, teams, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if not self._game(game_id).record(timestamp, teams):
+                return
+            if self._path_for is not None:
+                try:
+                    f = self._files.get(game_id)
+                    if f is None:
+                        f = self._files[game_id] = open(self._path_for(game_id), 'a')
+                    sample = {'time': timestamp,
+                              'teams': [{'id': team_key(i, team), 'name': team['name'], 'score': team['score']}
+                                        for i, team in enumerate(teams)]}
+                    f.write(json.dumps(sample) + '\n')
+                    f.flush()
+                except Exception as e:
+                    print(f"Error saving score history: {e}")
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+    def listener(self, game_id, version, teams, event):
+        # Signature used by ScorePipeline.add_listener
+        self.record(game_id, teams)
+
+    def query(self, game_id=None, start=None, end=None, points=200):
+        with self._lock:
+            history = self._game(game_id)
+            return {
+                'series': history.series(start, end, points),
+                'window_rates': history.window_rates(start, end),
+                'stats': history.stats(),
+            }
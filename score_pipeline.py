@@ -0,0 +1,205 @@
+import copy
+import threading
+import time
+
+# Score changes go through a single pipeline: each mutation produces a new
+# numbered state version which is handed to every registered sink (saving,
+# LEDs, audio, ...). Sinks run on their own threads and merge changes that
+# arrive while they are busy, so a burst of clicks costs each sink a bounded
+# amount of work instead of one call per click.
+
+
+class Sink:
+    """
+    An output fed by the pipeline.
+
+    handler(game_id, teams, events) is called with the newest teams of a game
+    and every event published since the handler last ran for that game. It is
+    called at most once every min_interval seconds per sink, and waits window
+    seconds after the first change of a batch so a burst is handled together.
+    """
+
+    def __init__(self, name, handler, min_interval=0.0, window=0.0):
+        self.name = name
+        self.handler = handler
+        self.min_interval = min_interval
+        self.window = window
+
+        self._pending = {}  # game_id -> [version, teams, events]
+        self._condition = threading.Condition()
+        self._busy = False
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        # Deliver anything still pending, then stop the worker thread
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def offer(self, game_id, version, teams, event=None):
+        with self._condition:
+            pending = self._pending.get(game_id)
+            if pending is None:
+                pending = self._pending[game_id] = [version, teams, []]
+            else:
+                # Keep only the newest state, but every event
+                pending[0] = version
+                pending[1] = teams
+            if event is not None:
+                pending[2].append(event)
+            self._condition.notify_all()
+        if not self._running:
+            self.start()
+
+    def flush(self, timeout=5):
+        # Wait until every offered version has been handled
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _run(self):
+        last_run = 0.0
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running and not self._pending:
+                    return
+
+            # Hold back until the rate limit allows another run; changes that
+            # arrive meanwhile are merged into the pending batch
+            wait = max(last_run + self.min_interval - time.time(), self.window)
+            if wait > 0:
+                time.sleep(wait)
+
+            with self._condition:
+                batch = self._pending
+                self._pending = {}
+                self._busy = True
+
+            for game_id, (_, teams, events) in batch.items():
+                try:
+                    self.handler(game_id, teams, events)
+                except Exception as e:
+                    print(f"Error in {self.name} output: {e}")
+            last_run = time.time()
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+
+class ScorePipeline:
+    """
+    Owns the current teams of every game and publishes each change to the sinks.
+
+    load(game_id) is used to read a game's teams the first time it is needed;
+    after that the pipeline's copy is the source of truth. copy_state makes the
+    private copies handed to callers; the default deep copy works for any
+    state but a copy that knows the structure is much cheaper.
+    """
+
+    def __init__(self, load, copy_state=copy.deepcopy):
+        self._load = load
+        self._copy = copy_state
+        self._states = {}  # game_id -> (version, teams)
+        self._lock = threading.Lock()
+        self.read_only = None  # Reason mutations are refused, e.g. on a replication follower
+        self.sinks = []
+        self.listeners = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def add_listener(self, listener):
+        # listener(game_id, version, teams, event) is called inline for every
+        # version, before the sinks; it must be quick and must not mutate teams
+        self.listeners.append(listener)
+        return listener
+
+    def _state(self, game_id):
+        state = self._states.get(game_id)
+        if state is None:
+            state = self._states[game_id] = (0, self._load(game_id))
+        return state
+
+    def snapshot(self, game_id=None):
+        # Returns (version, teams) with a private copy of the teams
+        with self._lock:
+            version, teams = self._state(game_id)
+            return version, self._copy(teams)
+
+    def mutate(self, game_id, change, event=None):
+        """
+        Apply change(teams) to a copy of the game's teams and publish the result.
+
+        change may return an event dict describing what happened, which is
+        passed to the sinks along with the new state. Exceptions raised by
+        change leave the state untouched.
+        """
+        if self.read_only:
+            raise PermissionError(self.read_only)
+        with self._lock:
+            version, teams = self._state(game_id)
+            teams = self._copy(teams)
+            result = change(teams)
+            if event is None:
+                event = result
+            version += 1
+            self._publish(game_id, version, teams, event)
+        return version, self._copy(teams)
+
+    def replace(self, game_id, version, teams, event=None):
+        # Install a state made elsewhere (a replication master) under its own
+        # version number; works even when the pipeline is read only
+        with self._lock:
+            teams = self._copy(teams)
+            self._publish(game_id, version, teams, event)
+
+    def _publish(self, game_id, version, teams, event):
+        self._states[game_id] = (version, teams)
+
+        for listener in self.listeners:
+            try:
+                listener(game_id, version, teams, event)
+            except Exception as e:
+                print(f"Error in score listener: {e}")
+
+        # Sinks share one read-only copy of this version
+        for sink in self.sinks:
+            sink.offer(game_id, version, teams, event)
+
+    def notify(self, game_id, event, sink_name=None):
+        # Hand an event that changes nothing, such as an announcement request,
+        # to the sinks (or only the named one) along with the current teams
+        with self._lock:
+            version, teams = self._state(game_id)
+            for sink in self.sinks:
+                if sink_name is None or sink.name == sink_name:
+                    sink.offer(game_id, version, teams, event)
+
+    def flush(self, timeout=5):
+        return all([sink.flush(timeout) for sink in self.sinks])
+
+    def stop(self, timeout=5):
+        for sink in self.sinks:
+            sink.stop(timeout)
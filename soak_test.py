@@ -0,0 +1,328 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+import requests
+
+from headless_app import prepare_workdir, remove_workdir, serve_app, quiet_access_log
+import hs
+from osc_listener import OscListener, send_osc
+from replication import ReplicationMaster, ReplicationFollower
+
+# Replays a whole show, hours of score events, in a few minutes and watches
+# the process for slow leaks.
+#
+# Everything runs as in a show, headless: the web app on a local port, the
+# OSC listener, the output pipeline with sound, TTS, history and LED outputs
+# (sACN to localhost, WLED to a dead local port so the retry path runs too),
+# replication to a local TCP follower and all windows under the supervisor.
+# A synthetic stream of clicks, OSC commands, announcements, page loads,
+# resets and team changes is replayed at --speed times real time, while RSS,
+# open file descriptors, threads (of this process and of the window
+# processes) and the size of the temporary directory are sampled. Series
+# that keep growing after the warm-up are flagged.
+#
+# Usage: python soak_test.py --hours 8 --speed 240
+#
+# Process statistics are read from /proc, so this runs on Linux only.
+
+# Growth below these is noise, not a leak
+tolerances = {
+    'rss': 16 * 1024 * 1024,  # The score history grows with every event, by design
+    'fds': 0,
+    'threads': 0,
+    'windows_rss': 16 * 1024 * 1024,
+    'windows_fds': 0,
+    'windows_threads': 0,
+    'temp_files': 0,
+    'temp_bytes': 0,
+}
+
+
+def process_stats(pid):
+    # (RSS bytes, open file descriptors, threads) of one process, None once it is gone
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return (int(fields['VmRSS'].split()[0]) * 1024, len(os.listdir(f"/proc/{pid}/fd")),
+                int(fields['Threads']))
+    except (OSError, KeyError, ValueError):
+        return None
+
+def dir_usage(path):
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass  # Removed while walking
+    return files, size
+
+def growth(values, warmup):
+    """
+    Compares the medians of the four quarters of a series after the warm-up.
+    Returns (rising, change, first, last): rising when every quarter is above
+    the one before, which a leak does and a busy but bounded process doesn't.
+    """
+    values = values[int(len(values) * warmup):]
+    if len(values) < 8:
+        return False, 0, None, None
+    n = len(values)
+    medians = [sorted(q)[len(q) // 2] for q in (values[i * n // 4:(i + 1) * n // 4] for i in range(4))]
+    rising = all(b > a for a, b in zip(medians, medians[1:]))
+    return rising, medians[-1] - medians[0], medians[0], medians[-1]
+
+def synthetic_events(rng, hours, rate, teams):
+    # (show seconds, kind, team index) at an average of rate events per show minute
+    show_time = 0.0
+    team_count = teams
+    while True:
+        show_time += rng.expovariate(rate / 60)
+        if show_time >= hours * 3600:
+            return
+        r = rng.random()
+        if r < 0.80:
+            kind = 'adjust'
+        elif r < 0.88:
+            kind = 'announce'
+        elif r < 0.90:
+            kind = 'announce_all'
+        elif r < 0.96:
+            kind = 'page'
+        elif r < 0.975:
+            kind = 'add_team' if team_count < teams + 2 else 'remove_team'
+        elif r < 0.99:
+            kind = 'remove_team' if team_count > 2 else 'add_team'
+        else:
+            kind = 'reset'
+        team_count += {'add_team': 1, 'remove_team': -1}.get(kind, 0)
+        yield show_time, kind, rng.randrange(team_count)
+
+
+class OfflineTTS:
+    """
+    Stands in for gTTS without a network: saves an empty file, so every
+    announcement fails at playback like a bad download would. Use --tts gtts
+    on a connected machine to play real announcements instead.
+    """
+
+    def __init__(self, text, lang='en'):
+        self.text = text
+
+    def save(self, filename):
+        open(filename, 'wb').close()
+
+
+class SoakTest:
+    def __init__(self, args):
+        self.args = args
+        self.samples = []
+        self.counts = {}
+        self.errors = 0
+        self.max_lag = 0.0  # Seconds the replay fell behind
+        self.show_time = 0.0
+        self._running = False
+
+    # Setup
+
+    def start(self):
+        self.workdir = prepare_workdir('hs-soak-', self.args.teams, {'sound_enabled': True, 'tts_enabled': True},
+                                       {'sacn_ip': '127.0.0.1', 'wled_ip': '127.0.0.1:9'})
+
+        # Temporary files of the app (TTS audio) go to a directory of their own
+        self.tempdir = os.path.join(self.workdir, 'tmp')
+        os.makedirs(self.tempdir)
+        tempfile.tempdir = self.tempdir
+
+        if self.args.tts == 'offline':
+            hs.gTTS = OfflineTTS
+
+        self.server, self.base_url = serve_app()
+        self.session = requests.Session()
+
+        self.osc = OscListener(hs.handle_osc_command, '127.0.0.1', 0).start()
+
+        # Replication to a follower over TCP, on any free port
+        self.master = ReplicationMaster(hs.replication_snapshot, snapshot_port=0, bind='127.0.0.1', multicast=False)
+        hs.score_pipeline.add_listener(
+            lambda game_id, version, teams, event: self.master.listener(game_id or hs.default_game_id,
+                                                                        version, teams, event))
+        self.master.start()
+        self.follower = ReplicationFollower(lambda game, version, teams: None, '127.0.0.1',
+                                            snapshot_port=self.master.snapshot_address[1], transport='tcp').start()
+
+        if not self.args.no_windows:
+            hs.preload_fonts()
+            hs.window_supervisor.hooks.append(hs.sync_team_windows)
+            hs.open_game_windows()
+            hs.window_supervisor.start()
+
+    def stop(self):
+        hs.window_supervisor.stop()
+        self.follower.stop()
+        self.master.stop()
+        self.osc.stop()
+        self.server.shutdown()
+        hs.score_pipeline.stop()
+        hs.score_history.close()
+        hs.output_hub.stop()
+        remove_workdir(self.workdir, self.args.keep)
+
+    # Load
+
+    def apply(self, kind, team_index):
+        osc_team = f"/team/{team_index + 1}"
+        if kind == 'adjust':
+            points = random.choice([1, 1, 1, 2, 5, -1])
+            if random.random() < 0.5:
+                response = self.session.post(self.base_url, allow_redirects=False,
+                                             data={'adjust': 'true', 'team_index': team_index, 'action': str(points)})
+            else:
+                send_osc('127.0.0.1', self.osc.address[1], [(f"{osc_team}/add", points)])
+                return
+        elif kind == 'announce':
+            send_osc('127.0.0.1', self.osc.address[1], [(f"{osc_team}/announce",)])
+            return
+        elif kind == 'announce_all':
+            send_osc('127.0.0.1', self.osc.address[1], [('/announce/all',)])
+            return
+        elif kind == 'page':
+            response = self.session.get(self.base_url + random.choice(['', 'config', 'api/teams', 'api/history',
+                                                                       'api/outputs', 'api/windows']))
+        elif kind == 'add_team':
+            response = self.session.post(self.base_url + 'api/teams', json={'name': f"Extra {team_index}"})
+        elif kind == 'remove_team':
+            response = self.session.delete(self.base_url + f"api/teams/{team_index}")
+        else:
+            response = self.session.post(self.base_url + 'config', data={'reset_scores': 'true'},
+                                         allow_redirects=False)
+        if response.status_code >= 400:
+            self.errors += 1
+
+    def sample(self):
+        own = process_stats(os.getpid())
+        windows = [process_stats(role['pid']) for role in hs.window_supervisor.status().values() if role['pid']]
+        windows = [stats for stats in windows if stats is not None]
+        temp_files, temp_bytes = dir_usage(self.tempdir)
+        self.samples.append({
+            'show_hours': self.show_time / 3600,
+            'rss': own[0], 'fds': own[1], 'threads': own[2],
+            'windows_rss': sum(s[0] for s in windows),
+            'windows_fds': sum(s[1] for s in windows),
+            'windows_threads': sum(s[2] for s in windows),
+            'windows': len(windows),
+            'temp_files': temp_files, 'temp_bytes': temp_bytes,
+        })
+
+    def run_sampler(self):
+        while self._running:
+            self.sample()
+            time.sleep(self.args.sample_every)
+
+    def run(self):
+        self.start()
+        self._running = True
+        sampler = threading.Thread(target=self.run_sampler, daemon=True)
+        try:
+            time.sleep(self.args.warmup_seconds)  # Let the windows and outputs settle
+            sampler.start()
+            started = time.time()
+            rng = random.Random(self.args.seed)
+            for show_time, kind, team_index in synthetic_events(rng, self.args.hours, self.args.rate,
+                                                                 self.args.teams):
+                due = started + show_time / self.args.speed
+                now = time.time()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    self.max_lag = max(self.max_lag, now - due)
+                self.show_time = show_time
+                self.counts[kind] = self.counts.get(kind, 0) + 1
+                try:
+                    self.apply(kind, team_index)
+                except (requests.RequestException, OSError) as e:
+                    print(f"Error replaying {kind}: {e}")
+                    self.errors += 1
+            hs.score_pipeline.flush(30)
+            self.sample()
+        finally:
+            self._running = False
+            report = self.report()
+            self.stop()
+        return report
+
+    # Analysis
+
+    def report(self):
+        metrics = {}
+        for metric, tolerance in tolerances.items():
+            values = [s[metric] for s in self.samples]
+            rising, change, first, last = growth(values, self.args.warmup)
+            metrics[metric] = {
+                'first': first, 'last': last, 'change': change,
+                'max': max(values) if values else None,
+                'per_show_hour': change / max(self.args.hours * (1 - self.args.warmup) * 0.75, 1e-9),
+                'leak': rising and change > tolerance,
+            }
+        return {
+            'config': {k: v for k, v in vars(self.args).items() if k != 'json'},
+            'events': self.counts,
+            'errors': self.errors,
+            'osc': {'received': self.osc.received, 'applied': self.osc.applied, 'failed': self.osc.failed},
+            'max_lag_seconds': round(self.max_lag, 2),
+            'window_restarts': sum(role['restarts'] for role in hs.window_supervisor.status().values()),
+            'outputs': hs.output_hub.status().get(None, []),
+            'replication': self.follower.status(),
+            'metrics': metrics,
+            'samples': self.samples,
+        }
+
+
+def print_report(report):
+    print(f"Events: {sum(report['events'].values())} {report['events']}, errors: {report['errors']}, "
+          f"OSC failed: {report['osc']['failed']}, replay fell behind by up to {report['max_lag_seconds']}s")
+    print(f"Window restarts: {report['window_restarts']}, replicated versions: {report['replication']['games']}")
+    print(f"{'metric':<18}{'first':>14}{'last':>14}{'max':>14}{'per hour':>14}")
+    for metric, m in report['metrics'].items():
+        cells = ''.join(f"{m[k]:14.0f}" if m[k] is not None else f"{'-':>14}"
+                        for k in ('first', 'last', 'max', 'per_show_hour'))
+        print(f"{metric:<18}{cells}   {'GROWING' if m['leak'] else 'ok'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a long show quickly and look for resource leaks.')
+    parser.add_argument('--hours', type=float, default=8, help='length of the simulated show')
+    parser.add_argument('--speed', type=float, default=240, help='how many times faster than real time')
+    parser.add_argument('--rate', type=float, default=20, help='events per show minute')
+    parser.add_argument('--teams', type=int, default=4, help='number of teams at the start')
+    parser.add_argument('--tts', choices=['offline', 'gtts'], default='offline',
+                        help='offline replaces gTTS with an unplayable file, exercising the failure path')
+    parser.add_argument('--no-windows', action='store_true', help="don't run the window processes")
+    parser.add_argument('--sample-every', type=float, default=1.0, help='seconds between samples')
+    parser.add_argument('--warmup', type=float, default=0.2, help='fraction of samples ignored as warm-up')
+    parser.add_argument('--warmup-seconds', type=float, default=3.0, help='seconds to settle before replaying')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the event stream')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory')
+    parser.add_argument('--json', help='also write the report, with every sample, to this file')
+    args = parser.parse_args()
+
+    quiet_access_log()
+
+    report = SoakTest(args).run()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(m['leak'] for m in report['metrics'].values()) else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,194 @@
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+
+# Keeps the window processes (team windows, overlay, projectors) running.
+#
+# Every role process gets a shared heartbeat value that it sets once per
+# frame. A process that exits with an error, or whose heartbeat stops, is
+# restarted at once; one that keeps failing right after starting is held
+# back with a growing delay. A clean exit (exit code 0, e.g. the window was
+# closed) is respected and the role is left stopped.
+
+
+def beat(heartbeat):
+    # Called by role processes once per frame
+    if heartbeat is not None:
+        heartbeat.value = time.time()
+
+
+class Role:
+    """
+    One supervised process.
+
+    target(*args, heartbeat=..., **kwargs) runs in the process. warm() may
+    return extra keyword arguments for each restart, such as the current
+    scores, so a restarted process can draw its first frame straight away.
+    Arguments are pickled when processes are spawned (Windows, macOS), so
+    only state passed this way reaches them; module globals such as loaded
+    fonts are only inherited where processes are forked.
+    on_exit(role) is called when the process stops cleanly.
+    """
+
+    def __init__(self, name, target, args=(), kwargs=None, warm=None, on_exit=None):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.warm = warm
+        self.on_exit = on_exit
+
+        self.heartbeat = multiprocessing.Value('d', 0.0, lock=False)
+        self.process = None
+        self.state = 'starting'
+        self.restarts = 0
+        self.started_at = None
+        self.last_exit = None  # Exit code of the last failure, or 'hung'
+        self.failures = 0  # Failures in a row, each soon after starting
+        self.backoff = 0.0
+        self.next_start = 0.0
+
+    def start(self):
+        kwargs = dict(self.kwargs)
+        if self.warm is not None and self.restarts:
+            try:
+                kwargs.update(self.warm())
+            except Exception as e:
+                print(f"Error preparing {self.name}: {e}")
+        kwargs['heartbeat'] = self.heartbeat
+        self.heartbeat.value = time.time()  # Grace period until the first frame
+        self.started_at = time.time()
+        self.process = multiprocessing.Process(target=self.target, args=self.args, kwargs=kwargs)
+        self.process.start()
+        self.state = 'running'
+
+    def terminate(self, timeout=1.0):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()  # Hung or stopped processes may ignore SIGTERM
+                self.process.join()
+            self.process = None
+
+    def status(self):
+        now = time.time()
+        running = self.process is not None
+        return {
+            'name': self.name,
+            'state': self.state,
+            'pid': self.process.pid if running else None,
+            'restarts': self.restarts,
+            'uptime': round(now - self.started_at, 1) if running else None,
+            'heartbeat_age': round(now - self.heartbeat.value, 2) if running else None,
+            'last_exit': self.last_exit,
+        }
+
+
+class Supervisor:
+    """
+    Starts role processes and restarts them when they fail or hang.
+
+    Roles are keyed by any hashable key. hooks are called on every check,
+    from the supervisor thread, to add or remove roles as needed.
+    """
+
+    def __init__(self, heartbeat_timeout=10.0, check_interval=0.25, stable_after=10.0, max_backoff=30.0):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.check_interval = check_interval
+        self.stable_after = stable_after  # A process that ran this long is no longer crash looping
+        self.max_backoff = max_backoff
+        self.roles = {}
+        self.hooks = []
+        self._lock = threading.RLock()
+        self._running = False
+        self._thread = None
+
+    def add(self, key, role):
+        with self._lock:
+            if key in self.roles:
+                return self.roles[key]
+            self.roles[key] = role
+            role.start()
+            return role
+
+    def remove(self, key):
+        with self._lock:
+            role = self.roles.pop(key, None)
+            if role is not None:
+                role.state = 'removed'
+                role.terminate()
+
+    def keys(self):
+        with self._lock:
+            return list(self.roles)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='supervisor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for key in self.keys():
+            self.remove(key)
+
+    def status(self):
+        with self._lock:
+            return {key: role.status() for key, role in self.roles.items()}
+
+    def check(self):
+        for hook in self.hooks:
+            try:
+                hook(self)
+            except Exception as e:
+                print(f"Error in supervisor hook: {e}")
+
+        now = time.time()
+        with self._lock:
+            for role in list(self.roles.values()):
+                if role.state != 'removed':  # By an on_exit callback
+                    self._check_role(role, now)
+
+    def _check_role(self, role, now):
+        process = role.process
+        if process is None:
+            if role.state == 'restarting' and now >= role.next_start:
+                role.start()
+        elif not process.is_alive():
+            process.join()
+            role.process = None
+            if process.exitcode == 0:
+                role.state = 'stopped'
+                if role.on_exit is not None:
+                    role.on_exit(role)
+            else:
+                self._schedule_restart(role, process.exitcode, now)
+        elif now - role.heartbeat.value > self.heartbeat_timeout:
+            print(f"{role.name} stopped responding, restarting it")
+            role.terminate()
+            self._schedule_restart(role, 'hung', now)
+
+    def _schedule_restart(self, role, reason, now):
+        role.restarts += 1
+        role.last_exit = reason
+        # The first failure is restarted at once, a crash loop waits longer each time
+        role.failures = role.failures + 1 if now - role.started_at < self.stable_after else 1
+        role.backoff = 0.0 if role.failures == 1 else min(0.5 * 2 ** (role.failures - 2), self.max_backoff)
+        role.next_start = now + role.backoff
+        role.state = 'restarting'
+        if role.backoff == 0.0:
+            role.start()
+
+    def _run(self):
+        while self._running:
+            with self._lock:
+                sentinels = [role.process.sentinel for role in self.roles.values() if role.process is not None]
+            # Wake up as soon as a process exits, so a crash costs a frame or two
+            multiprocessing.connection.wait(sentinels, self.check_interval)
+            self.check()
@@ -4,25 +4,78 @@ import requests
 wled_ip = "10.0.0.162"
 segments_info = []
 
-def wled_init():
+# Seconds to wait for a WLED device before giving up on a request
+default_timeout = 2.0
+
+
+class WledClient:
     """
-    Initialize the WLED by loading preset 1 and reading segment information.
-    This function should always be called first.
+    One WLED device reached over its JSON API.
+
+    Every request has a timeout so an unreachable device fails quickly
+    instead of blocking the caller.
     """
-    global segments_info
 
-    try:
+    def __init__(self, host, timeout=default_timeout):
+        self.host = host
+        self.timeout = timeout
+        self.segments_info = []
+        self.session = requests.Session()
+
+    def init(self):
+        """
+        Load preset 1 and read segment information.
+        Raises requests.RequestException when the device can't be reached.
+        """
         # Load preset 1 using the correct JSON API call
-        response = requests.post(f"http://{wled_ip}/json/state", json={"ps": 1})
+        response = self.session.post(f"http://{self.host}/json/state", json={"ps": 1}, timeout=self.timeout)
         response.raise_for_status()
 
         # Get the current state to read segments information
-        response = requests.get(f"http://{wled_ip}/json/state")
+        response = self.session.get(f"http://{self.host}/json/state", timeout=self.timeout)
         response.raise_for_status()
+        self.segments_info = response.json().get('seg', [])
+        return self.segments_info
 
-        # Parse the JSON response to get segment information
-        data = response.json()
-        segments_info = data.get('seg', [])
+    def set_state(self, payload):
+        response = self.session.post(f"http://{self.host}/json/state", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def set_percentages(self, percentages):
+        # Update several segments in one request: {segment number: percentage}
+        self.set_state({"seg": [percentage_segment(self.segments_info[segment - 1], segment, percentage)
+                                for segment, percentage in percentages.items()]})
+
+    def close(self):
+        self.session.close()
+
+
+def percentage_segment(segment_info, segment, percentage):
+    # Segment payload that turns on a percentage of the segment's LEDs
+    total_leds = segment_info['len']
+    leds_to_turn_on = int((percentage / 100) * total_leds)
+    return {
+        "id": segment - 1,  # Segment IDs are zero-based in the API
+        "on": True,
+        "fx": 0,  # Static mode (no effect)
+        "sx": 0,  # Effect speed (irrelevant for static)
+        "ix": 255,  # Full intensity
+        "start": segment_info['start'],
+        "stop": segment_info['stop'],
+        "col": [segment_info.get('col', [[255, 255, 255]])[0]],  # Use the first color from the preset
+        "rng": [{"start": segment_info['start'], "stop": segment_info['start'] + leds_to_turn_on}]
+    }
+
+
+def wled_init():
+    """
+    Initialize the WLED by loading preset 1 and reading segment information.
+    This function should always be called first.
+    """
+    global segments_info
+
+    try:
+        segments_info = WledClient(wled_ip).init()
 
         # Output the number of segments and their LED counts
         print(f"Preset 1 loaded. Number of segments: {len(segments_info)}")
@@ -50,30 +103,11 @@ def wled_setpercentage(segment, percentage):
         return
 
     try:
-        # Calculate the number of LEDs to turn on based on the percentage
-        segment_info = segments_info[segment - 1]
-        total_leds = segment_info['len']
-        leds_to_turn_on = int((percentage / 100) * total_leds)
-
         # Generate JSON payload to turn on the specified percentage of LEDs in the segment
-        payload = {
-            "seg": [
-                {
-                    "id": segment - 1,  # Segment IDs are zero-based in the API
-                    "on": True,
-                    "fx": 0,  # Static mode (no effect)
-                    "sx": 0,  # Effect speed (irrelevant for static)
-                    "ix": 255,  # Full intensity
-                    "start": segment_info['start'],
-                    "stop": segment_info['stop'],
-                    "col": [segment_info.get('col', [[255, 255, 255]])[0]],  # Use the first color from the preset
-                    "rng": [{"start": segment_info['start'], "stop": segment_info['start'] + leds_to_turn_on}]
-                }
-            ]
-        }
+        payload = {"seg": [percentage_segment(segments_info[segment - 1], segment, percentage)]}
 
         # Send the request to update the WLED state
-        response = requests.post(f"http://{wled_ip}/json/state", json=payload)
+        response = requests.post(f"http://{wled_ip}/json/state", json=payload, timeout=default_timeout)
         response.raise_for_status()
 
         print(f"Set {percentage}% of LEDs on segment {segment}.")
@@ -110,7 +144,7 @@ def wled_setwhite(segment):
         }
 
         # Send the request to update the WLED state
-        response = requests.post(f"http://{wled_ip}/json/state", json=payload)
+        response = requests.post(f"http://{wled_ip}/json/state", json=payload, timeout=default_timeout)
         response.raise_for_status()
 
         print(f"Segment {segment} set to white.")
@@ -118,7 +152,8 @@ def wled_setwhite(segment):
     except requests.RequestException as e:
         print(f"Error setting segment {segment} to white: {e}")
 
-# Example Usage
-wled_init()
-#wled_setpercentage(2, 6)  # Set 10% of LEDs in segment 1 to turn on
-wled_setwhite(1)  # Set segment 1 to white
+if __name__ == '__main__':
+    # Example Usage
+    wled_init()
+    #wled_setpercentage(2, 6)  # Set 10% of LEDs in segment 1 to turn on
+    wled_setwhite(1)  # Set segment 1 to white